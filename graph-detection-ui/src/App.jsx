@@ -1,6 +1,10 @@
 import React, { useEffect, useRef, useState, useCallback } from "react";
 import axios from "axios";
 
+// Stable id for this tab, so the server keeps its feature pause, touch tracking and
+// admission apart from other kiosks behind the same address
+const CLIENT_HEADERS = { headers: { "X-Session-Id": `${Date.now()}-${Math.random().toString(36).slice(2)}` } };
+
 function App() {
   const videoRef = useRef(null);
   const canvasRef = useRef(null);
@@ -35,6 +39,8 @@ function App() {
   const [error, setError] = useState("");
 
   const API_BASE_URL = "http://localhost:8000";
+  // Frames the server dropped in favour of a newer one (409) or while overloaded (429)
+  const SKIPPED_FRAME_STATUSES = [409, 429];
 
   // Play audio from base64
   const playAudio = useCallback((base64Audio) => {
@@ -82,6 +88,7 @@ function App() {
       const formData = new FormData();
       formData.append("file", blob, "frame.jpg");
       formData.append("language", language);
+      if (rotationSession) formData.append("session_id", rotationSession);
 
       const response = await axios.post(`${API_BASE_URL}/detect-object-rotation/`, formData);
       const data = response.data;
@@ -180,6 +187,8 @@ function App() {
         );
       }
     } catch (err) {
+      // A newer frame replaced this one (409) or the server is busy (429): just skip the frame
+      if (SKIPPED_FRAME_STATUSES.includes(err.response?.status)) return;
       console.log("Rotation detection error:", err.message);
       if (err.response?.status !== 400) {
         setError(language === 'en'
@@ -192,7 +201,7 @@ function App() {
         ctx.clearRect(0, 0, 640, 480);
       }
     }
-  }, [mode, isRotating, captureFrame, language]);
+  }, [mode, isRotating, rotationSession, captureFrame, language]);
 
   // Process feature detection
   const processFeatureDetection = useCallback(async () => {
@@ -206,7 +215,7 @@ function App() {
       formData.append("file", blob, "frame.jpg");
       formData.append("language", language);
 
-      const response = await axios.post(`${API_BASE_URL}/detect-feature/`, formData);
+      const response = await axios.post(`${API_BASE_URL}/detect-feature/`, formData, CLIENT_HEADERS);
       const data = response.data;
 
       // Draw bounding box if feature is detected
@@ -250,7 +259,7 @@ function App() {
                    (now - featureHoldStart >= FEATURE_HOLD_SECONDS)) {
           
           // Start the feature announcement process
-          await axios.post(`${API_BASE_URL}/start-feature-announcement/`);
+          await axios.post(`${API_BASE_URL}/start-feature-announcement/`, null, CLIENT_HEADERS);
 
           try {
             // Announce the detected feature with description
@@ -288,7 +297,7 @@ function App() {
             setFeatureHoldStart(null);
           } finally {
             // Always end the announcement process, even if there was an error
-            await axios.post(`${API_BASE_URL}/end-feature-announcement/`);
+            await axios.post(`${API_BASE_URL}/end-feature-announcement/`, null, CLIENT_HEADERS);
           }
         }
       } else if (now > featureCooldownUntil) {
@@ -297,6 +306,8 @@ function App() {
         setFeatureHoldStart(null);
       }
     } catch (err) {
+      // Skipped frames must not reset how long the current feature has been held
+      if (SKIPPED_FRAME_STATUSES.includes(err.response?.status)) return;
       console.log("Feature detection error:", err);
       // Clear canvas on error
       const ctx = canvasRef.current.getContext('2d');
@@ -374,15 +385,14 @@ function App() {
           });
         });
 
-        // Now start the rotation detection
-        setIsRotating(true);
-        setRotationProgress(0);
-        
+        // Now start the rotation detection, frames are only sent once the session exists
         const response = await axios.post(`${API_BASE_URL}/start-rotation-detection/`, {
-          session_id: Date.now().toString(),
+          session_id: `${Date.now()}-${Math.random().toString(36).slice(2)}`,
           language: language
         });
         setRotationSession(response.data.session_id);
+        setRotationProgress(0);
+        setIsRotating(true);
       }
     } catch (err) {
       setError(language === 'en'
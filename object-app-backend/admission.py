@@ -0,0 +1,140 @@
+import asyncio
+import os
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+
+class AdmissionBusy(Exception):
+    """Raised when the server is at its in-flight limit and a frame cannot wait for a slot"""
+
+
+class FrameSuperseded(Exception):
+    """Raised for a waiting frame once a newer frame from the same client arrives"""
+
+
+class AdmissionController:
+    """Decide which client frames get processed when the server is behind.
+
+    At most max_in_flight frames are processed at once, and at most per_client of
+    them from one client. Each client has at most one frame waiting. A newer frame
+    replaces it in place, and the older request fails with FrameSuperseded, so
+    answers are never for stale frames. Free slots go to waiting clients in arrival
+    order, so one fast client cannot starve the rest. Frames that would wait beyond
+    max_waiting clients, or longer than wait_timeout, get AdmissionBusy.
+
+    Clients that send no session id are keyed by their address, so every kiosk
+    behind one NAT or proxy shares a key. Those shared keys get per_address frames
+    in flight instead of per_client, though they still keep only one frame waiting.
+    """
+
+    def __init__(self, max_in_flight: int = 16, per_client: int = 1, max_waiting: int = 64, wait_timeout: float = 2.0,
+                 per_address: int = 4):
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.per_client = max(1, int(per_client))
+        self.per_address = max(1, int(per_address))
+        self.max_waiting = max(0, int(max_waiting))
+        self.wait_timeout = wait_timeout
+        self.in_flight = 0
+        self._active = {}  # client id -> frames being processed
+        self._waiting = OrderedDict()  # client id -> future of its newest waiting frame
+        self._shared = set()  # client ids that are addresses rather than sessions
+        self.rejected = {"busy": 0, "superseded": 0}
+
+    def _limit(self, client_id: str) -> int:
+        return self.per_address if client_id in self._shared else self.per_client
+
+    def _can_run(self, client_id: str) -> bool:
+        return self.in_flight < self.max_in_flight and self._active.get(client_id, 0) < self._limit(client_id)
+
+    def _admit(self, client_id: str):
+        self.in_flight += 1
+        self._active[client_id] = self._active.get(client_id, 0) + 1
+
+    def _release(self, client_id: str):
+        self.in_flight -= 1
+        remaining = self._active.get(client_id, 1) - 1
+        if remaining:
+            self._active[client_id] = remaining
+        else:
+            self._active.pop(client_id, None)
+            if client_id not in self._waiting:
+                self._shared.discard(client_id)
+        self._dispatch()
+
+    def _dispatch(self):
+        """Hand free slots to waiting clients, oldest waiting client first"""
+        for client_id in list(self._waiting):
+            if self.in_flight >= self.max_in_flight:
+                break
+            if self._active.get(client_id, 0) >= self._limit(client_id):
+                continue
+            future = self._waiting.pop(client_id)
+            if not future.done():
+                self._admit(client_id)
+                future.set_result(None)
+
+    async def _acquire(self, client_id: str, shared: bool):
+        if shared:
+            self._shared.add(client_id)
+        if not self._waiting and self._can_run(client_id):
+            self._admit(client_id)
+            return
+
+        previous = self._waiting.get(client_id)
+        if previous is None and len(self._waiting) >= self.max_waiting:
+            if client_id not in self._active:
+                self._shared.discard(client_id)
+            self.rejected["busy"] += 1
+            raise AdmissionBusy(f"Server busy ({self.in_flight} frames in flight, {len(self._waiting)} clients waiting)")
+
+        future = asyncio.get_running_loop().create_future()
+        # Assigning to an existing key keeps the client's place in line
+        self._waiting[client_id] = future
+        if previous is not None and not previous.done():
+            self.rejected["superseded"] += 1
+            previous.set_exception(FrameSuperseded("Superseded by a newer frame"))
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.wait_timeout)
+        except BaseException as e:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # Admitted just as the wait gave up, hand the slot back
+                self._release(client_id)
+            elif self._waiting.get(client_id) is future:
+                del self._waiting[client_id]
+                if client_id not in self._active:
+                    self._shared.discard(client_id)
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected["busy"] += 1
+                raise AdmissionBusy(f"Server busy, no slot within {self.wait_timeout}s")
+            raise
+
+    @asynccontextmanager
+    async def slot(self, client_id: str, shared: bool = False):
+        """Hold one processing slot for a client frame (shared=True when client_id is an address)"""
+        await self._acquire(client_id, shared)
+        try:
+            yield
+        finally:
+            self._release(client_id)
+
+    def status(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "per_client": self.per_client,
+            "per_address": self.per_address,
+            "waiting_clients": len(self._waiting),
+            "rejected": dict(self.rejected),
+        }
+
+
+def create_admission() -> AdmissionController:
+    return AdmissionController(
+        max_in_flight=int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "16")),
+        per_client=int(os.getenv("ADMISSION_PER_CLIENT", "1")),
+        per_address=int(os.getenv("ADMISSION_PER_ADDRESS", "4")),
+        max_waiting=int(os.getenv("ADMISSION_MAX_WAITING", "64")),
+        wait_timeout=float(os.getenv("ADMISSION_WAIT_S", "2")),
+    )
@@ -0,0 +1,151 @@
+import asyncio
+import functools
+import os
+
+from execution import PoolBusyError
+
+
+# Defaults can be overridden per deployment without touching the code
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "10"))
+BATCH_MAX_QUEUE = int(os.getenv("BATCH_MAX_QUEUE", "64"))
+
+
+class InferenceBatcher:
+    """Gather frames from concurrent requests and run them through one batched predict"""
+
+    def __init__(self, model, name: str, max_batch_size: int = BATCH_MAX_SIZE, max_wait_ms: float = BATCH_MAX_WAIT_MS,
+                 max_queue: int = BATCH_MAX_QUEUE, pool=None, max_concurrent: int = 1):
+        self.model = model
+        self.name = name
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_queue = max(1, int(max_queue))
+        self.pool = pool
+        # Batches run one at a time unless the model can serve several (inference worker processes)
+        self.max_concurrent = max(1, int(max_concurrent))
+        self._slots = None
+        self._running = set()
+        self._queue = None
+        self._worker = None
+        self.in_flight = 0  # frames queued or being predicted
+
+    def start(self):
+        """Start the background batching task on the running event loop"""
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the batching task and fail any frames still waiting"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        running = list(self._running)
+        for task in running:
+            task.cancel()
+        # Each cancelled batch fails its own frames, see _run_batch
+        await asyncio.gather(*running, return_exceptions=True)
+        while not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            self._fail_stopped(future)
+
+    def _fail_stopped(self, future):
+        if not future.done():
+            future.set_exception(RuntimeError(f"{self.name} batcher stopped"))
+
+    async def predict(self, img, **predict_kwargs):
+        """Queue one frame and wait for its own Results object"""
+        if self._worker is None:
+            self.start()
+        if self._queue.qsize() >= self.max_queue:
+            raise PoolBusyError(f"{self.name} batch queue is full ({self._queue.qsize()} frames waiting)")
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight += 1
+        try:
+            await self._queue.put((img, predict_kwargs, future))
+            return await future
+        finally:
+            self.in_flight -= 1
+
+    async def _collect(self):
+        """Wait for the first frame, then keep filling the batch until it is full or the wait expires"""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued before waiting on the clock
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            # With a single slot, frames keep queueing while the previous batch runs
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = asyncio.create_task(self._run_batch(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, batch: list):
+        try:
+            # Frames can only share a forward pass when they use the same predict arguments
+            groups = {}
+            for item in batch:
+                key = tuple(sorted(item[1].items()))
+                groups.setdefault(key, []).append(item)
+
+            for key, items in groups.items():
+                await self._predict_group(dict(key), items)
+        except asyncio.CancelledError:
+            for _, _, future in batch:
+                self._fail_stopped(future)
+            raise
+        finally:
+            self._slots.release()
+
+    async def _predict_group(self, predict_kwargs: dict, items: list):
+        images = [img for img, _, _ in items]
+        job = None
+        try:
+            job = self._start_predict(images, predict_kwargs)
+            results = await (self.pool.wait(job) if self.pool is not None else job)
+        except Exception as e:
+            print(f"{self.name} batch inference error: {type(e).__name__}: {e}")
+            for _, _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            if job is not None and not job.done():
+                # The predict thread still uses the model after a timeout, so this batch
+                # keeps its slot until it returns and no second predict runs alongside it
+                await asyncio.wait([job])
+            return
+
+        for (_, _, future), result in zip(items, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _start_predict(self, images: list, predict_kwargs: dict) -> asyncio.Future:
+        predict = functools.partial(self.model.predict, images, verbose=False, **predict_kwargs)
+        if self.pool is not None:
+            return self.pool.submit(predict)
+        return asyncio.get_running_loop().run_in_executor(None, predict)
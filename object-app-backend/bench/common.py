@@ -0,0 +1,96 @@
+import glob
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Training and validation mosaics saved under runs/detect, used as realistic frames
+RUN_IMAGES = ("runs/detect/*/val_batch*.jpg", "runs/detect/*/train_batch*.jpg")
+
+
+def use_backend_dir():
+    """Make the backend modules importable and resolve relative paths (yolo_models, runs) like main.py does"""
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+
+
+def synthetic_frame(width: int = 640, height: int = 480, seed: int = 0):
+    """A camera-sized BGR frame with a few solid shapes on a noisy background"""
+    rng = np.random.default_rng(seed)
+    img = rng.integers(90, 140, (height, width, 3), dtype=np.uint8)
+    cv2.rectangle(img, (width // 4, height // 4), (width // 2, height // 2), (40, 80, 200), -1)
+    cv2.circle(img, (2 * width // 3, height // 2), height // 6, (200, 160, 40), -1)
+    return img
+
+
+def load_frames(source: str = "runs", limit: int = 16, width: int = 640, height: int = 480) -> list:
+    """JPEG-encoded frames to replay, either the saved run images or synthetic ones"""
+    frames = []
+    if source == "runs":
+        for pattern in RUN_IMAGES:
+            for path in sorted(glob.glob(os.path.join(BACKEND_DIR, pattern))):
+                img = cv2.imread(path)
+                if img is not None:
+                    frames.append(cv2.imencode(".jpg", cv2.resize(img, (width, height)))[1].tobytes())
+    if not frames:
+        frames = [cv2.imencode(".jpg", synthetic_frame(width, height, seed))[1].tobytes() for seed in range(limit)]
+    return frames[:limit]
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies_ms: list, errors: int, elapsed_s: float) -> dict:
+    values = sorted(latencies_ms)
+    return {
+        "requests": len(values) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(values) / elapsed_s, 2) if elapsed_s > 0 else 0.0,
+        "mean_ms": round(sum(values) / len(values), 2) if values else 0.0,
+        "p50_ms": round(percentile(values, 50), 2),
+        "p95_ms": round(percentile(values, 95), 2),
+        "p99_ms": round(percentile(values, 99), 2),
+        "max_ms": round(values[-1], 2) if values else 0.0,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def write_results(path: str, kind: str, config: dict, results: dict):
+    """Write a JSON report that compare.py can diff against another commit's report"""
+    report = {
+        "kind": kind,
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "config": config,
+        "results": results,
+    }
+    if path:
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {path}")
+    return report
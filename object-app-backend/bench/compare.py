@@ -0,0 +1,48 @@
+"""Compare two benchmark reports (from loadgen.py or micro.py) and flag regressions.
+
+    python bench/compare.py baseline.json candidate.json --threshold 10
+
+Exits with status 1 when any p95 latency grows, or throughput drops, by more than the threshold.
+"""
+import argparse
+import json
+
+# Metric -> True when bigger is better
+METRICS = {"throughput_rps": True, "mean_ms": False, "p50_ms": False, "p95_ms": False, "p99_ms": False}
+GATED = ("throughput_rps", "p95_ms")
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> list:
+    """Return (name, metric, old, new, change %, regressed) rows for every shared result"""
+    rows = []
+    for name, old in baseline["results"].items():
+        new = candidate["results"].get(name)
+        if new is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            if metric not in old or metric not in new or not old[metric]:
+                continue
+            change = (new[metric] - old[metric]) / old[metric] * 100
+            worse = -change if higher_is_better else change
+            rows.append((name, metric, old[metric], new[metric], change, metric in GATED and worse > threshold))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed regression in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"baseline {baseline['commit']} -> candidate {candidate['commit']}")
+    rows = compare(baseline, candidate, args.threshold)
+    for name, metric, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:>44} {metric:>15}: {old:10.2f} -> {new:10.2f} ({change:+6.1f}%){flag}")
+    raise SystemExit(1 if any(row[5] for row in rows) else 0)
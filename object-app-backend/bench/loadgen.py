@@ -0,0 +1,121 @@
+"""Replay frames against the detection and speech endpoints and report latency per endpoint.
+
+Run from object-app-backend, either against a running server:
+
+    TTS_BACKEND=stub uvicorn main:app --port 8000
+    python bench/loadgen.py --url http://localhost:8000 --concurrency 16 --duration 30
+
+or fully in-process (the app is imported with the offline stub TTS backend):
+
+    python bench/loadgen.py --in-process --concurrency 8 --rate 20 --output load.json
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import time
+
+import httpx
+
+from common import load_frames, summarize, use_backend_dir, write_results
+
+ENDPOINTS = ("detect-object", "detect-object-rotation", "detect-feature", "analyze-frame", "speak")
+
+SPEAK_TEXTS = (
+    "Please move to the next feature",
+    "You are touching a vertex.",
+    "Detection not confident. Please rotate the object again.",
+)
+
+
+def build_request(endpoint: str, frame: bytes, worker: int, seq: int) -> dict:
+    """httpx request arguments for one call to an endpoint"""
+    if endpoint == "speak":
+        return {"url": "/speak/", "json": {"text": SPEAK_TEXTS[seq % len(SPEAK_TEXTS)], "language": "en"}}
+    # One session per simulated kiosk, so admission control sees separate clients
+    data = {"language": "en", "session_id": f"bench-{worker}"}
+    return {"url": f"/{endpoint}/", "files": {"file": ("frame.jpg", frame, "image/jpeg")}, "data": data}
+
+
+async def run_worker(client, endpoint: str, frames: list, worker: int, deadline: float, interval: float,
+                     max_requests: int, latencies: list, errors: list):
+    frame_cycle = itertools.cycle(frames[worker % len(frames):] + frames[:worker % len(frames)])
+    next_send = time.perf_counter()
+    for seq in itertools.count():
+        if time.perf_counter() >= deadline or (max_requests and seq >= max_requests):
+            return
+        if interval:
+            # Pace to the requested frame rate, like a camera that produces frames on a clock
+            await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+            next_send += interval
+
+        request = build_request(endpoint, next(frame_cycle), worker, seq)
+        start = time.perf_counter()
+        try:
+            response = await client.post(**request)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            # 400 "no object" answers are normal for detection endpoints, while
+            # 5xx, busy (429) and superseded (409) frames count as failures
+            if response.status_code >= 500 or response.status_code in (409, 429):
+                errors.append(response.status_code)
+            else:
+                latencies.append(elapsed_ms)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+
+
+async def run_endpoint(client, endpoint: str, frames: list, args) -> dict:
+    latencies, errors = [], []
+    interval = args.concurrency / args.rate if args.rate else 0.0
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*[
+        run_worker(client, endpoint, frames, worker, deadline, interval, args.requests, latencies, errors)
+        for worker in range(args.concurrency)
+    ])
+    result = summarize(latencies, len(errors), time.perf_counter() - start)
+    print(f"{endpoint:>24}: {result['throughput_rps']:8.2f} req/s  p50 {result['p50_ms']:8.1f} ms  "
+          f"p95 {result['p95_ms']:8.1f} ms  p99 {result['p99_ms']:8.1f} ms  errors {result['errors']}")
+    return result
+
+
+async def run(args):
+    frames = load_frames(args.frames, args.frame_limit, args.width, args.height)
+    if args.in_process:
+        os.environ.setdefault("TTS_BACKEND", "stub")
+        use_backend_dir()
+        import main as app_module
+        # ASGITransport does not run startup events, so load the models before sending traffic
+        await app_module.models.wait_ready()
+        transport = httpx.ASGITransport(app=app_module.app)
+        base_url = "http://bench"
+    else:
+        transport = None
+        base_url = args.url
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits, timeout=args.timeout) as client:
+        for endpoint in args.endpoints:
+            results[endpoint] = await run_endpoint(client, endpoint, frames, args)
+
+    config = {k: v for k, v in vars(args).items() if k != "output"}
+    write_results(args.output, "load", config, results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--in-process", action="store_true", help="drive the app in-process with the stub TTS backend")
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), choices=ENDPOINTS)
+    parser.add_argument("--concurrency", type=int, default=8, help="simulated clients per endpoint")
+    parser.add_argument("--rate", type=float, default=0, help="total requests per second across clients (0 = as fast as possible)")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per endpoint")
+    parser.add_argument("--requests", type=int, default=0, help="stop each client after this many requests (0 = no limit)")
+    parser.add_argument("--frames", default="runs", choices=("runs", "synthetic"))
+    parser.add_argument("--frame-limit", type=int, default=16)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    asyncio.run(run(parser.parse_args()))
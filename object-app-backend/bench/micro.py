@@ -0,0 +1,94 @@
+"""Micro-benchmarks for the stages behind every request: decode, predict and TTS.
+
+Run from object-app-backend:
+
+    python bench/micro.py --output micro.json
+    MODEL_ENGINE=onnx python bench/micro.py --stages predict --batch-sizes 1 8
+"""
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+from common import load_frames, summarize, synthetic_frame, use_backend_dir, write_results
+
+
+def time_calls(fn, iterations: int, warmup: int = 2) -> dict:
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call_start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - call_start) * 1000)
+    return summarize(latencies, 0, time.perf_counter() - start)
+
+
+def bench_decode(args) -> dict:
+    from ingest import decode_frame
+
+    results = {}
+    hd = cv2.imencode(".jpg", cv2.resize(synthetic_frame(), (1920, 1080)))[1].tobytes()
+    vga = load_frames(args.frames, 1)[0]
+    results["jpeg_1080p_full"] = time_calls(lambda: decode_frame(hd), args.iterations)
+    results["jpeg_1080p_reduced"] = time_calls(lambda: decode_frame(hd, 640), args.iterations)
+    results["jpeg_640x480"] = time_calls(lambda: decode_frame(vga, 640), args.iterations)
+    return results
+
+
+def bench_predict(args) -> dict:
+    from engines import create_engine
+
+    results = {}
+    frames = [cv2.imdecode(np.frombuffer(f, np.uint8), cv2.IMREAD_COLOR) for f in load_frames(args.frames, max(args.batch_sizes))]
+    for name in ("object_model", "touch_model"):
+        engine = create_engine(name, f"yolo_models/{name}.pt")
+        model = engine.load()
+        for batch_size in args.batch_sizes:
+            batch = (frames * batch_size)[:batch_size]
+            result = time_calls(lambda: model.predict(batch, imgsz=640, conf=0.25, verbose=False), args.iterations)
+            result["per_frame_ms"] = round(result["mean_ms"] / batch_size, 2)
+            results[f"{name}_{engine.active_engine}_batch{batch_size}"] = result
+    return results
+
+
+def bench_tts(args) -> dict:
+    from tts import AudioCache, load_backend
+
+    results = {}
+    backend = load_backend(args.tts_backend)
+    texts = [f"Benchmark phrase number {i}" for i in range(args.iterations + 2)]
+    results[f"{backend.name}_synthesize"] = time_calls(lambda: backend.synthesize(texts[0], "en"), args.iterations)
+
+    cache = AudioCache(backend, cache_dir=None, max_items=len(texts))
+    misses = iter(texts)
+    results[f"{backend.name}_cache_miss"] = time_calls(lambda: cache.get(next(misses), "en"), args.iterations)
+    results[f"{backend.name}_cache_hit"] = time_calls(lambda: cache.get(texts[0], "en"), args.iterations)
+    return results
+
+
+STAGES = {"decode": bench_decode, "predict": bench_predict, "tts": bench_tts}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 4, 8])
+    parser.add_argument("--frames", default="runs", choices=("runs", "synthetic"))
+    parser.add_argument("--tts-backend", default=os.getenv("TTS_BACKEND", "stub"))
+    parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    args = parser.parse_args()
+
+    use_backend_dir()
+    results = {}
+    for stage in args.stages:
+        for name, result in STAGES[stage](args).items():
+            results[f"{stage}/{name}"] = result
+            print(f"{stage + '/' + name:>44}: mean {result['mean_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms")
+
+    config = {k: v for k, v in vars(args).items() if k != "output"}
+    write_results(args.output, "micro", config, results)
@@ -0,0 +1,92 @@
+import itertools
+import zipfile
+
+import cv2
+
+from ingest import decode_frame
+
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def auto_stride(total: int, target_frames: int) -> int:
+    """Stride that spreads target_frames samples over the whole clip (1 when the length is unknown)"""
+    return max(1, total // target_frames) if total > 0 else 1
+
+
+def fit_frame(img, target_size: int = None):
+    """Shrink a decoded frame to target_size on the long side, returning (image, scale back to the frame)"""
+    height, width = img.shape[:2]
+    if not target_size or max(height, width) <= target_size:
+        return img, (1.0, 1.0)
+    ratio = target_size / max(height, width)
+    small = cv2.resize(img, (round(width * ratio), round(height * ratio)), interpolation=cv2.INTER_AREA)
+    return small, (width / small.shape[1], height / small.shape[0])
+
+
+def _video_iter(capture, stride: int, target_size: int):
+    try:
+        for index in itertools.count():
+            # grab() only demuxes; skipped frames are never converted to images
+            if not capture.grab():
+                return
+            if index % stride:
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                return
+            yield (index, *fit_frame(frame, target_size))
+    finally:
+        capture.release()
+
+
+def video_frames(path: str, stride: int = 0, target_frames: int = 50, target_size: int = None):
+    """Sample frames from a video file one at a time. Returns (stride, iterator of (index, image, scale))"""
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        capture.release()
+        raise ValueError("Could not open video")
+    stride = stride or auto_stride(int(capture.get(cv2.CAP_PROP_FRAME_COUNT)), target_frames)
+    return stride, _video_iter(capture, stride, target_size)
+
+
+def _zip_iter(archive, names: list, stride: int, target_size: int, max_member_bytes: int):
+    try:
+        for index in range(0, len(names), stride):
+            # The declared size bounds what read() will inflate, so check it before decompressing
+            if max_member_bytes and archive.getinfo(names[index]).file_size > max_member_bytes:
+                raise ValueError(f"{names[index]} is larger than {max_member_bytes} bytes uncompressed")
+            yield (index, *decode_frame(archive.read(names[index]), target_size))
+    finally:
+        archive.close()
+
+
+def zip_frames(file, stride: int = 0, target_frames: int = 50, target_size: int = None, max_member_bytes: int = 0):
+    """Sample images from a zip archive in name order, reading one member (of at most max_member_bytes) at a time"""
+    archive = zipfile.ZipFile(file)
+    names = sorted(
+        name for name in archive.namelist()
+        if name.lower().endswith(IMAGE_SUFFIXES) and not name.startswith("__MACOSX/")
+    )
+    if not names:
+        archive.close()
+        raise ValueError("No images in the archive")
+    stride = stride or auto_stride(len(names), target_frames)
+    return stride, _zip_iter(archive, names, stride, target_size, max_member_bytes)
+
+
+def _files_iter(files: list, stride: int, target_size: int):
+    for index in range(0, len(files), stride):
+        files[index].seek(0)
+        yield (index, *decode_frame(files[index].read(), target_size))
+
+
+def image_frames(files: list, stride: int = 0, target_frames: int = 50, target_size: int = None):
+    """Sample separately uploaded images (file objects) in upload order"""
+    stride = stride or auto_stride(len(files), target_frames)
+    return stride, _files_iter(files, stride, target_size)
+
+
+def take(frames, count: int) -> list:
+    """Next count items of a frame iterator (fewer at the end of the clip)"""
+    return list(itertools.islice(frames, count))
@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+
+
+def class_confidences(results, num_classes: int) -> np.ndarray:
+    """Best box confidence per class for one frame (zero for classes with no box)"""
+    scores = np.zeros(num_classes, dtype=np.float64)
+    if results.boxes:
+        for cls_id, conf in zip(results.boxes.cls.tolist(), results.boxes.conf.tolist()):
+            scores[int(cls_id)] = max(scores[int(cls_id)], float(conf))
+    return scores
+
+
+class SequentialDecision:
+    """Bayesian posterior over the object classes, updated with every frame's class confidences.
+
+    Each frame is read as a distribution over classes: the detected confidences, with
+    the remaining mass spread evenly. It is mixed with a uniform noise floor so one
+    wrong box cannot rule a class out. evidence_weight < 1 tempers consecutive frames,
+    which are strongly correlated. A session stops as soon as the leading class
+    reaches the confidence target after at least min_frames frames.
+    """
+
+    def __init__(self, confidence: float = 0.99, min_frames: int = 10, noise_floor: float = 0.1, evidence_weight: float = 0.5):
+        self.confidence = confidence
+        self.min_frames = min_frames
+        self.noise_floor = noise_floor
+        self.evidence_weight = evidence_weight
+
+    def frame_log_likelihood(self, scores: np.ndarray) -> np.ndarray:
+        num_classes = len(scores)
+        total = scores.sum()
+        if total > 1.0:
+            probs = scores / total
+        else:
+            probs = scores + (1.0 - total) / num_classes
+        likelihood = (1.0 - self.noise_floor) * probs + self.noise_floor / num_classes
+        return self.evidence_weight * np.log(likelihood)
+
+    def update(self, log_posterior: np.ndarray, scores: np.ndarray):
+        """Fold one frame into the (unnormalized) log posterior in place"""
+        if scores.any():
+            log_posterior += self.frame_log_likelihood(scores)
+            log_posterior -= log_posterior.max()  # keep the numbers small
+
+    def posterior(self, log_posterior: np.ndarray) -> np.ndarray:
+        probs = np.exp(log_posterior - log_posterior.max())
+        return probs / probs.sum()
+
+    def decide(self, log_posterior: np.ndarray, frame_count: int):
+        """Return (class index, probability) once the evidence is sufficient, otherwise None"""
+        if frame_count < self.min_frames or not len(log_posterior):
+            return None
+        probs = self.posterior(log_posterior)
+        index = int(probs.argmax())
+        if probs[index] >= self.confidence:
+            return index, float(probs[index])
+        return None
+
+
+def create_decision():
+    """Sequential decision from ROTATION_DECISION, or None to always wait for target_frames"""
+    if os.getenv("ROTATION_DECISION", "sequential") != "sequential":
+        return None
+    return SequentialDecision(
+        confidence=float(os.getenv("ROTATION_CONFIDENCE", "0.99")),
+        min_frames=int(os.getenv("ROTATION_MIN_FRAMES", "10")),
+        noise_floor=float(os.getenv("ROTATION_NOISE_FLOOR", "0.1")),
+        evidence_weight=float(os.getenv("ROTATION_EVIDENCE_WEIGHT", "0.5")),
+    )
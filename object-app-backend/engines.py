@@ -0,0 +1,192 @@
+import glob
+import hashlib
+import os
+import shutil
+import time
+
+import numpy as np
+
+
+# Suffix ultralytics gives each exported format (a file for ONNX, a directory for OpenVINO)
+EXPORT_SUFFIXES = {"onnx": ".onnx", "openvino": "_openvino_model"}
+
+def exported_format(path: str):
+    """Engine an already exported model path belongs to, or None for a checkpoint"""
+    path = path.rstrip("/")
+    return next((engine for engine, suffix in EXPORT_SUFFIXES.items() if path.endswith(suffix)), None)
+
+# Precisions each engine can produce on a CPU-only box
+SUPPORTED_PRECISIONS = {
+    "torch": ("fp32",),
+    "onnx": ("fp32", "int8"),        # int8 via ONNX Runtime dynamic quantization
+    "openvino": ("fp32", "fp16", "int8"),  # int8 needs a calibration dataset (MODEL_INT8_DATA)
+}
+
+# Validation mosaics saved by training, one set per model
+PARITY_IMAGES = "runs/detect/{name}/val_batch*_labels.jpg"
+
+
+class ModelEngine:
+    """A YOLO model served either from its PyTorch checkpoint or from a cached exported artifact"""
+
+    def __init__(self, name: str, weights: str, engine: str = "torch", precision: str = "fp32",
+                 imgsz: int = 640, cache_dir: str = "yolo_models/exported", int8_data: str = None):
+        if engine not in SUPPORTED_PRECISIONS:
+            raise ValueError(f"Unknown engine: {engine}")
+        if precision not in SUPPORTED_PRECISIONS[engine]:
+            raise ValueError(f"{engine} does not support {precision}")
+        self.name = name
+        self.weights = weights
+        self.engine = engine
+        self.precision = precision
+        self.imgsz = imgsz
+        self.cache_dir = cache_dir
+        self.int8_data = int8_data
+        self.model = None
+        self.active_engine = None
+        self.warmup_ms = None
+
+    def _fingerprint(self) -> str:
+        digest = hashlib.sha256()
+        with open(self.weights, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()[:12]
+
+    def artifact_path(self) -> str:
+        """Cache location, keyed by checkpoint contents so retrained weights are re-exported"""
+        stem = os.path.splitext(os.path.basename(self.weights))[0]
+        name = f"{stem}-{self._fingerprint()}-{self.precision}-{self.imgsz}{EXPORT_SUFFIXES[self.engine]}"
+        return os.path.join(self.cache_dir, name)
+
+    def export(self) -> str:
+        """Export the checkpoint to the configured engine and move it into the cache"""
+        from ultralytics import YOLO
+        artifact = self.artifact_path()
+        print(f"Exporting {self.name} to {self.engine} ({self.precision})...")
+        export_args = {"format": self.engine, "imgsz": self.imgsz, "dynamic": True}  # dynamic batch for the batcher
+        if self.engine == "openvino" and self.precision == "fp16":
+            export_args["half"] = True
+        if self.engine == "openvino" and self.precision == "int8":
+            export_args["int8"] = True
+            export_args["data"] = self.int8_data
+        exported = YOLO(self.weights).export(**export_args)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if self.engine == "onnx" and self.precision == "int8":
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(exported, artifact, weight_type=QuantType.QUInt8)
+            os.remove(exported)
+        else:
+            if os.path.isdir(artifact):
+                shutil.rmtree(artifact)
+            elif os.path.exists(artifact):
+                os.remove(artifact)
+            shutil.move(exported, artifact)
+        return artifact
+
+    def load(self):
+        """Load the model, exporting on first use and falling back to PyTorch if that fails"""
+        # Imported here so the server can start before torch and ultralytics are loaded
+        from ultralytics import YOLO
+        if self.engine != "torch":
+            try:
+                artifact = self.artifact_path()
+                if not os.path.exists(artifact):
+                    artifact = self.export()
+                self.model = YOLO(artifact, task="detect")
+                self.active_engine = self.engine
+                return self.model
+            except Exception as e:
+                print(f"Could not load {self.engine} engine for {self.name}, using PyTorch: {e}")
+
+        self.model = YOLO(self.weights, task="detect")
+        self.active_engine = exported_format(self.weights) or "torch"
+        return self.model
+
+    def warmup(self, runs: int = 2):
+        """Run a few dummy predictions so the first real request does not pay for lazy initialization"""
+        blank = np.full((self.imgsz, self.imgsz, 3), 114, dtype=np.uint8)
+        start = time.perf_counter()
+        for _ in range(runs):
+            self.model.predict(blank, imgsz=self.imgsz, verbose=False)
+        self.warmup_ms = round((time.perf_counter() - start) * 1000 / runs, 1)
+
+    def status(self) -> dict:
+        return {
+            "engine": self.active_engine,
+            "requested_engine": self.engine,
+            "precision": self.precision if self.active_engine == self.engine else "fp32",
+            "warmup_ms": self.warmup_ms,
+        }
+
+
+def create_engine(name: str, weights: str, imgsz: int = 640) -> ModelEngine:
+    """Engine for one model from MODEL_ENGINE / MODEL_PRECISION (defaults: PyTorch fp32)"""
+    return ModelEngine(
+        name,
+        weights,
+        engine=os.getenv("MODEL_ENGINE", "torch"),
+        precision=os.getenv("MODEL_PRECISION", "fp32"),
+        imgsz=imgsz,
+        cache_dir=os.getenv("MODEL_EXPORT_DIR", "yolo_models/exported"),
+        int8_data=os.getenv("MODEL_INT8_DATA"),
+    )
+
+
+def _iou(a, b) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def parity_check(reference, candidate, images: list, imgsz: int = 640, conf: float = 0.25) -> dict:
+    """Compare a candidate model's detections against the PyTorch reference on the same images"""
+    matched = total = 0
+    conf_diffs = []
+    for path in images:
+        ref = reference.predict(path, imgsz=imgsz, conf=conf, verbose=False)[0].boxes
+        cand = candidate.predict(path, imgsz=imgsz, conf=conf, verbose=False)[0].boxes
+        cand_boxes = list(zip(cand.cls.tolist(), cand.conf.tolist(), cand.xyxy.tolist()))
+        for cls_id, score, box in zip(ref.cls.tolist(), ref.conf.tolist(), ref.xyxy.tolist()):
+            total += 1
+            best = max(
+                (c for c in cand_boxes if c[0] == cls_id and _iou(box, c[2]) >= 0.5),
+                key=lambda c: _iou(box, c[2]),
+                default=None,
+            )
+            if best:
+                matched += 1
+                conf_diffs.append(abs(score - best[1]))
+    return {
+        "images": len(images),
+        "reference_boxes": total,
+        "box_agreement": round(matched / total, 4) if total else 1.0,
+        "max_conf_diff": round(max(conf_diffs), 4) if conf_diffs else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    from ultralytics import YOLO
+    parser = argparse.ArgumentParser(description="Export the YOLO models and check them against PyTorch")
+    parser.add_argument("--engine", default=os.getenv("MODEL_ENGINE", "onnx"), choices=("onnx", "openvino"))
+    parser.add_argument("--precision", default=os.getenv("MODEL_PRECISION", "fp32"))
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    args = parser.parse_args()
+
+    failed = False
+    for name in ("object_model", "touch_model"):
+        weights = f"yolo_models/{name}.pt"
+        engine = ModelEngine(name, weights, args.engine, args.precision)
+        candidate = engine.load()
+        if engine.active_engine != args.engine:
+            failed = True
+            continue
+        images = sorted(glob.glob(PARITY_IMAGES.format(name=name)))
+        result = parity_check(YOLO(weights), candidate, images)
+        print(f"{name} [{args.engine} {args.precision}]: {result}")
+        failed = failed or result["box_agreement"] < args.min_agreement
+    raise SystemExit(1 if failed else 0)
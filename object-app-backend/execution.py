@@ -0,0 +1,104 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class PoolBusyError(Exception):
+    """Raised when a pool already has as many jobs queued as it is allowed to hold"""
+
+
+def _discard_result(job: asyncio.Future):
+    # Nobody awaits a timed out job, so retrieve its exception to keep asyncio from logging it
+    if not job.cancelled():
+        job.exception()
+
+
+class BoundedPool:
+    """Executor wrapper with a fixed size, a per-job timeout and a cap on queued jobs"""
+
+    def __init__(self, name: str, max_workers: int, max_pending: int, timeout: float, kind: str = "thread"):
+        self.name = name
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max(1, int(max_pending))
+        self.timeout = timeout
+        self.kind = kind
+        if kind == "process":
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self.pending = 0
+
+    def submit(self, fn, *args, **kwargs) -> asyncio.Future:
+        """Start fn in the pool. The returned future completes when fn returns, even if wait() gave up on it.
+
+        A job counts as pending from here until fn returns, so jobs whose callers timed
+        out still fill the pool and new work is refused while they hold its threads.
+        """
+        if self.pending >= self.max_pending:
+            raise PoolBusyError(f"{self.name} pool is full ({self.pending} jobs queued or running)")
+        loop = asyncio.get_running_loop()
+        job = loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+        self.pending += 1
+        job.add_done_callback(self._job_done)
+        return job
+
+    def _job_done(self, job: asyncio.Future):
+        self.pending -= 1
+
+    async def wait(self, job: asyncio.Future):
+        """Wait for a submitted job for at most the pool timeout"""
+        try:
+            # A timed out job keeps its worker until it returns, but the caller is released
+            return await asyncio.wait_for(asyncio.shield(job), self.timeout)
+        except asyncio.TimeoutError:
+            job.add_done_callback(_discard_result)
+            raise asyncio.TimeoutError(f"{self.name} job did not finish within {self.timeout}s") from None
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn in the pool without blocking the event loop"""
+        return await self.wait(self.submit(fn, *args, **kwargs))
+
+    def status(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "timeout": self.timeout,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Decoding only needs the raw bytes, so it may run in separate processes.
+decode_pool = BoundedPool(
+    "decode",
+    max_workers=int(os.getenv("DECODE_POOL_SIZE", "2")),
+    max_pending=int(os.getenv("DECODE_MAX_PENDING", "32")),
+    timeout=float(os.getenv("DECODE_TIMEOUT_S", "5")),
+    kind=os.getenv("DECODE_POOL_KIND", "thread"),
+)
+
+# Predict always runs on threads: the model itself when it lives in this process, or a
+# thread waiting on an inference worker process, so there is one thread per worker.
+inference_pool = BoundedPool(
+    "inference",
+    max_workers=int(os.getenv("INFERENCE_POOL_SIZE", str(max(2, 2 * int(os.getenv("INFERENCE_WORKERS", "0")))))),
+    max_pending=int(os.getenv("INFERENCE_MAX_PENDING", "16")),
+    timeout=float(os.getenv("INFERENCE_TIMEOUT_S", "10")),
+)
+
+# gTTS is network bound, so it gets its own pool and never competes with inference.
+tts_pool = BoundedPool(
+    "tts",
+    max_workers=int(os.getenv("TTS_POOL_SIZE", "4")),
+    max_pending=int(os.getenv("TTS_MAX_PENDING", "32")),
+    timeout=float(os.getenv("TTS_TIMEOUT_S", "10")),
+)
+
+
+def shutdown_pools():
+    for pool in (decode_pool, inference_pool, tts_pool):
+        pool.shutdown()
@@ -0,0 +1,129 @@
+import os
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+# Side of the grayscale thumbnail frames are compared on
+SIGNATURE_SIZE = 32
+
+# Square crop sizes tried around the last box, multiples of the model stride so
+# crops run at their native scale and crops of the same size batch together
+ROI_SIZES = (192, 320, 448)
+
+
+def frame_signature(img) -> np.ndarray:
+    """Tiny grayscale thumbnail of a BGR frame, cheap enough to compute on every frame"""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    return cv2.resize(gray, (SIGNATURE_SIZE, SIGNATURE_SIZE), interpolation=cv2.INTER_AREA)
+
+
+def changed_fraction(a: np.ndarray, b: np.ndarray, pixel_threshold: int = 12) -> float:
+    """Share of thumbnail pixels that moved by more than pixel_threshold grey levels (sensor noise stays below it)"""
+    return float(np.count_nonzero(cv2.absdiff(a, b) > pixel_threshold)) / a.size
+
+
+def roi_window(box, shape, margin: float = 0.5):
+    """Square crop (x1, y1, x2, y2) around a box with margin on each side, or None if no ROI size fits"""
+    height, width = shape[:2]
+    x1, y1, x2, y2 = box
+    needed = max(x2 - x1, y2 - y1) * (1 + 2 * margin)
+    side = next((size for size in ROI_SIZES if size >= needed), None)
+    if side is None or side >= max(width, height):
+        return None
+    cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+    left = int(min(max(cx - side / 2, 0), max(width - side, 0)))
+    top = int(min(max(cy - side / 2, 0), max(height - side, 0)))
+    return left, top, min(left + side, width), min(top + side, height)
+
+
+class ClientTrack:
+    __slots__ = ("signature", "detection", "frames_since_full", "last_seen")
+
+    def __init__(self):
+        self.signature = None   # signature of the last frame that went through the model
+        self.detection = None   # (cls_id, confidence, (x1, y1, x2, y2)) in image coordinates, or None
+        self.frames_since_full = 0
+        self.last_seen = time.monotonic()
+
+
+class TouchGate:
+    """Per-client temporal gate in front of the touch model.
+
+    A frame whose thumbnail barely differs from the last inferred frame reuses that
+    detection ("cache"). A changed frame with a previous box is run on a crop around
+    it ("roi"). Otherwise, and at least every full_every frames, the full frame goes
+    through the model ("full").
+    """
+
+    def __init__(self, change_threshold: float = 0.02, full_every: int = 15, margin: float = 0.5,
+                 ttl_s: float = 30, max_clients: int = 1024):
+        self.change_threshold = change_threshold
+        self.full_every = max(1, int(full_every))
+        self.margin = margin
+        self.ttl_s = ttl_s
+        self.max_clients = max(1, int(max_clients))
+        self._clients = OrderedDict()
+
+    def _track(self, client_id: str) -> ClientTrack:
+        now = time.monotonic()
+        # Take the client out first so a returning client never counts against the cap or evicts itself
+        track = self._clients.pop(client_id, None)
+        if track is not None and now - track.last_seen >= self.ttl_s:
+            track = None
+        while self._clients:
+            oldest_id, oldest = next(iter(self._clients.items()))
+            if now - oldest.last_seen < self.ttl_s and len(self._clients) < self.max_clients:
+                break
+            del self._clients[oldest_id]
+        track = track or ClientTrack()
+        track.last_seen = now
+        self._clients[client_id] = track
+        return track
+
+    def plan(self, client_id: str, img):
+        """Decide how to handle a frame.
+
+        Returns (source, value, signature): ("cache", detection), ("roi", crop window)
+        or ("full", None), plus the frame signature to pass back to record().
+        """
+        track = self._track(client_id)
+        signature = frame_signature(img)
+        track.frames_since_full += 1
+        if track.frames_since_full >= self.full_every or track.signature is None:
+            return "full", None, signature
+        if changed_fraction(signature, track.signature) < self.change_threshold:
+            return "cache", track.detection, signature
+        if track.detection is not None:
+            window = roi_window(track.detection[2], img.shape, self.margin)
+            if window is not None:
+                return "roi", window, signature
+        return "full", None, signature
+
+    def record(self, client_id: str, signature, detection, source: str):
+        """Remember what the model found on a frame that went through it"""
+        track = self._clients.get(client_id)
+        if track is None:
+            return
+        track.signature = signature
+        track.detection = detection
+        if source == "full":
+            track.frames_since_full = 0
+
+    def status(self) -> dict:
+        return {"clients": len(self._clients), "change_threshold": self.change_threshold, "full_every": self.full_every}
+
+
+def create_touch_gate():
+    """Gate configured from TOUCH_GATE_* variables, or None when TOUCH_GATE=0"""
+    if os.getenv("TOUCH_GATE", "1") != "1":
+        return None
+    return TouchGate(
+        change_threshold=float(os.getenv("TOUCH_GATE_CHANGE", "0.02")),
+        full_every=int(os.getenv("TOUCH_GATE_FULL_EVERY", "15")),
+        margin=float(os.getenv("TOUCH_GATE_MARGIN", "0.5")),
+        ttl_s=float(os.getenv("TOUCH_GATE_TTL_S", "30")),
+        max_clients=int(os.getenv("TOUCH_GATE_MAX_CLIENTS", "1024")),
+    )
@@ -0,0 +1,122 @@
+import cv2
+import numpy as np
+
+
+# JPEG decoders can scale by 1/2, 1/4 and 1/8 while decoding, which is far cheaper than a full decode plus resize
+REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# Start-of-frame markers carry the image size (DHT, JPG and DAC share the range but do not)
+SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+RAW_CHANNELS = {"bgr": 3, "rgb": 3, "gray": 1}
+
+
+def jpeg_size(contents: bytes):
+    """Read (width, height) from a JPEG header without decoding it, or None if it is not a JPEG"""
+    if contents[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 9 < len(contents):
+        if contents[i] != 0xFF:
+            return None
+        marker = contents[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:  # markers without a length field
+            i += 2
+            continue
+        if marker in SOF_MARKERS:
+            height = int.from_bytes(contents[i + 5:i + 7], "big")
+            width = int.from_bytes(contents[i + 7:i + 9], "big")
+            return width, height
+        i += 2 + int.from_bytes(contents[i + 2:i + 4], "big")
+    return None
+
+
+def decode_frame(contents: bytes, target_size: int = None):
+    """Decode an uploaded JPEG/PNG frame into a BGR image.
+
+    With a target_size, JPEGs larger than needed are decoded at 1/2, 1/4 or 1/8 scale,
+    never below target_size on the long side. Returns (image, (scale_x, scale_y)) where
+    the scale maps coordinates in the decoded image back to the original frame.
+    """
+    flag = cv2.IMREAD_COLOR
+    size = jpeg_size(contents) if target_size else None
+    if size:
+        for factor, reduced_flag in REDUCED_DECODE_FLAGS:
+            if max(size) // factor >= target_size:
+                flag = reduced_flag
+                break
+
+    img = cv2.imdecode(np.frombuffer(contents, np.uint8), flag)
+    if img is None:
+        raise ValueError("Could not decode image")
+    if not size or flag == cv2.IMREAD_COLOR:
+        return img, (1.0, 1.0)
+    width, height = size
+    if (width - height) * (img.shape[1] - img.shape[0]) < 0:
+        # The decoder applied an EXIF orientation that turned the frame by 90 degrees
+        width, height = height, width
+    return img, (width / img.shape[1], height / img.shape[0])
+
+
+def wrap_raw_frame(contents: bytes, width: int, height: int, frame_format: str = "bgr",
+                   orig_width: int = None, orig_height: int = None):
+    """Wrap an uncompressed uint8 frame as a NumPy image (BGR frames are not copied).
+
+    orig_width/orig_height give the camera resolution the client resized from, so
+    boxes can be reported in original-frame coordinates. Returns (image, scale).
+    """
+    channels = RAW_CHANNELS.get(frame_format)
+    if channels is None:
+        raise ValueError(f"Unsupported raw frame format: {frame_format}")
+    if not width or not height or len(contents) != width * height * channels:
+        raise ValueError(f"Raw frame size does not match {width}x{height} {frame_format}")
+
+    img = np.frombuffer(contents, np.uint8).reshape(height, width, channels)
+    if frame_format == "rgb":
+        img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+    elif frame_format == "gray":
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    return img, ((orig_width or width) / width, (orig_height or height) / height)
+
+
+def letterbox(img, size: int, stride: int = 32):
+    """Resize to size on the long side and pad to a multiple of stride, the rectangular
+    letterbox YOLO applies, so a model run at imgsz=size leaves the image untouched.
+
+    Returns (image, ratio, (pad_left, pad_top)).
+    """
+    height, width = img.shape[:2]
+    ratio = size / max(height, width)
+    new_width, new_height = round(width * ratio), round(height * ratio)
+    if (new_width, new_height) != (width, height):
+        img = cv2.resize(img, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    pad_width, pad_height = -new_width % stride, -new_height % stride
+    left, top = pad_width // 2, pad_height // 2
+    if pad_width or pad_height:
+        img = cv2.copyMakeBorder(img, top, pad_height - top, left, pad_width - left,
+                                 cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return img, ratio, (left, top)
+
+
+def unletterbox(xyxy, ratio: float, pad, shape) -> tuple:
+    """Map a box from letterboxed coordinates back to the image letterbox() was given (of this shape)"""
+    height, width = shape[:2]
+    left, top = pad
+    x1, y1, x2, y2 = xyxy
+    x1, x2 = (min(max((x - left) / ratio, 0.0), width) for x in (x1, x2))
+    y1, y2 = (min(max((y - top) / ratio, 0.0), height) for y in (y1, y2))
+    return x1, y1, x2, y2
+
+
+def scale_box(xyxy, scale) -> dict:
+    """Map an (x1, y1, x2, y2) box from the inference image to original-frame pixels"""
+    sx, sy = scale
+    x1, y1, x2, y2 = xyxy
+    return {"x1": int(x1 * sx), "y1": int(y1 * sy), "x2": int(x2 * sx), "y2": int(y2 * sy)}
@@ -1,17 +1,29 @@
-import cv2
-import torch
+import asyncio
 import base64
-import collections
+import hmac
+import json
+import re
+import tempfile
 import time
-from ultralytics import YOLO
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
+import zipfile
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Header, Depends, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from gtts import gTTS
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import os
-import numpy as np
-from io import BytesIO
-from pydantic import BaseModel
+from clips import image_frames, take, video_frames, zip_frames
+from admission import AdmissionBusy, FrameSuperseded, create_admission
+from batching import InferenceBatcher
+from registry import ModelNotReady, ModelRegistry
+from workers import create_workers
+from execution import PoolBusyError, decode_pool, inference_pool, tts_pool, shutdown_pools
+from ingest import RAW_CHANNELS, decode_frame, letterbox, scale_box, unletterbox, wrap_raw_frame
+from tts import audio_cache
+from tta import augmented_views, weighted_vote
+from sessions import RotationState, create_session_store
+from decision import class_confidences, create_decision
+from gating import create_touch_gate
+from metrics import SERVER_TIMING, metrics, request_started, request_timings, server_timing_header
 
 app = FastAPI()
 
@@ -24,18 +36,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load YOLO models
-try:
-    object_model = YOLO("yolo_models/object_model.pt")
-    touch_model = YOLO("yolo_models/touch_model.pt")
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    print(f"Models loaded successfully on device: {device}")
-    print("Object model class names:", object_model.names)
-    print("Touch model class names:", touch_model.names)
-except Exception as e:
-    print(f"Error loading models: {e}")
-    object_model = None
-    touch_model = None
+# Both models run at this input size, so frames never need to be decoded larger
+INFERENCE_SIZE = 640
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Time every request by route, and attach a Server-Timing header when enabled
+    (SERVER_TIMING=1, or per request with an "X-Server-Timing: 1" header)"""
+    start = time.perf_counter()
+    request_started.set(start)
+    timings = [] if SERVER_TIMING or request.headers.get("x-server-timing") == "1" else None
+    request_timings.set(timings)
+    
+    response = await call_next(request)
+    
+    elapsed = time.perf_counter() - start
+    route = request.scope.get("route")
+    metrics.observe("http_request_duration_seconds", elapsed, route=route.path if route else "unmatched")
+    if timings is not None:
+        timings.append(("total", elapsed))
+        response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
+
+# YOLO models load in the background after startup, through their configured inference engine
+# (PyTorch, ONNX Runtime or OpenVINO), each served by a batcher that merges frames from concurrent requests.
+# With INFERENCE_WORKERS > 0 they run in that many worker processes instead of this one.
+models = ModelRegistry(pool=inference_pool, warmup=os.getenv("MODEL_WARMUP", "1") == "1", workers=create_workers())
+models.add("object_model", "yolo_models/object_model.pt", INFERENCE_SIZE)
+models.add("touch_model", "yolo_models/touch_model.pt", INFERENCE_SIZE)
+for name, slot in models.slots.items():
+    metrics.gauge_callback("inferences_in_flight", lambda batcher=slot.batcher: batcher.in_flight, model=name)
+
+@app.on_event("startup")
+async def start_models():
+    models.start()
+
+@app.on_event("shutdown")
+async def stop_models():
+    await models.stop()
+    shutdown_pools()
+
+def require_model(name: str) -> InferenceBatcher:
+    """Batcher serving a model, or a 503 while the model is loading or failed to load"""
+    try:
+        return models.batcher(name)
+    except ModelNotReady as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
 
 # Object introductions in both languages
 introductions = {
@@ -58,11 +104,36 @@ introductions = {
 }
 
 
-# Session storage for rotation-based detection
-rotation_sessions = {}
+# Session storage for rotation-based detection, keyed by client-supplied session id
+rotation_store = create_session_store()
+
+# Normalized object labels, indexed like the model's class ids (filled in once the object model is ready)
+object_labels = []
+object_label_index = {}
 
-# Feature detection state
-is_processing_feature = False
+def set_object_labels(model):
+    object_labels[:] = [model.names[i].strip().lower().replace(" ", "_") for i in sorted(model.names)]
+    object_label_index.clear()
+    object_label_index.update({label: i for i, label in enumerate(object_labels)})
+
+models.on_ready("object_model", set_object_labels)
+
+# Early-stopping rule for rotation sessions (None keeps the fixed target_frames vote)
+rotation_decision = create_decision()
+# Fewest frames any verdict may rest on, so a one-frame clip cannot name an object
+MIN_VERDICT_FRAMES = rotation_decision.min_frames if rotation_decision else int(os.getenv("ROTATION_MIN_FRAMES", "10"))
+
+# Clients in the middle of a feature announcement, with when their pause runs out
+# (in case the end-feature-announcement call never comes)
+feature_pauses = {}
+FEATURE_PAUSE_MAX_S = float(os.getenv("FEATURE_PAUSE_MAX_S", "60"))
+
+# Limits how many frames are processed at once, fairly across clients, newest frame first
+admission = create_admission()
+metrics.gauge_callback("admission_in_flight", lambda: admission.in_flight)
+
+# Skips touch-model inference on frames that have not changed since the client's last one
+touch_gate = create_touch_gate()
 
 # Feature translations and descriptions
 feature_translations = {
@@ -136,36 +207,291 @@ feature_translations = {
     }
 }
 
-class RotationSession(BaseModel):
-    session_id: str
-    label_counts: dict = {}
-    frame_count: int = 0
-    target_frames: int = 50
-    detection_threshold: int = 26
-    language: str = "en"
+# Fixed prompts and error messages spoken by the endpoints
+messages = {
+    "en": {
+        "rotation_start": " please hold and slowly rotate the object for analysis.",
+        "no_object_in_view": "No object detected. Please show an object and try again.",
+        "not_confident": "Detection not confident. Please rotate the object again.",
+        "no_object": "No object detected. Please try again.",
+        "next_feature": "Please move to the next feature",
+        "next_step": "Press T to start feature detection"
+    },
+    "si": {
+        "no_object_in_view": "කිසිදු වස්තුවක් හඳුනා නොගැනිණි. කරුණාකර වස්තුවක් පෙන්වා නැවත උත්සාහ කරන්න.",
+        "not_confident": "හඳුනා ගැනීම ස්ථිර නැත. කරුණාකර වස්තුව නැවත කරකවන්න.",
+        "no_object": "කිසිදු වස්තුවක් හඳුනා නොගැනිණි. කරුණාකර නැවත උත්සාහ කරන්න.",
+        "next_feature": "කරුණාකර ඊළඟ ලක්ෂණයට යන්න",
+        "next_step": "ලක්ෂණ හඳුනා ගැනීම ආරම්භ කිරීමට T යතුර ඔබන්න"
+    }
+}
+
+def static_phrases():
+    """Every fixed (text, language) pair the API can speak, used to warm the audio cache"""
+    for language in ("en", "si"):
+        for text in introductions[language].values():
+            yield text, language
+        for feature_info in feature_translations[language].values():
+            yield feature_info["description"], language
+        for key, text in messages[language].items():
+            if key != "next_step":  # shown on screen, never spoken
+                yield text, language
 
-def create_new_session(session_id: str, language: str = "en") -> dict:
+def create_new_session(language: str = "en") -> RotationState:
     """Create a new rotation session with standard parameters"""
+    return RotationState(
+        len(object_labels),
+        language=language,
+        target_frames=50,
+        detection_threshold=26,
+        max_empty_frames=15
+    )
+
+def top_detection(results, names: dict, scale=(1.0, 1.0)):
+    """Return the label and original-frame bounding box of the most confident box, or (None, None)"""
+    if not results.boxes:
+        return None, None
+    box = results.boxes[0]
+    label = names[int(box.cls[0])].strip().lower().replace(" ", "_")
+    return label, scale_box(box.xyxy[0].tolist(), scale)
+
+def object_verdict(session: RotationState, label: str) -> tuple:
+    """Successful rotation verdict and the introduction to speak for it"""
+    # Get description in correct language
+    intro = introductions[session.language].get(
+        label,
+        f"This is a {label.replace('_', ' ')}." if session.language == "en" else f"මෙය {label.replace('_', ' ')} එකකි."
+    )
     return {
-        "label_counts": collections.Counter(),
-        "frame_count": 0,
-        "target_frames": 50,
-        "detection_threshold": 26,
-        "language": language
-    }
+        "object": label,
+        "description": intro,
+        "detection_complete": True,
+        "next_step": messages[session.language]["next_step"],
+        "language": session.language,
+        "frames_used": session.frame_count
+    }, intro
 
-def speak_as_base64(text: str, language: str = 'en') -> str:
-    """Convert text to speech and return as base64 encoded audio"""
+def advance_rotation(session: RotationState, label, language: str = "en", scores=None):
+    """Count one frame towards a rotation session's vote.
+
+    scores holds the frame's per-class confidences; with the sequential decision
+    enabled they update the session's posterior and can end it before target_frames.
+    Returns None while more frames are needed, otherwise a (response, text to speak)
+    pair. The caller is responsible for discarding the finished session.
+    """
+    if label:
+        session.counts[object_label_index[label]] += 1
+        session.consecutive_empty_frames = 0  # Reset counter when object detected
+    else:
+        session.consecutive_empty_frames += 1  # Increment counter when no object detected
+        
+        # If no object detected for too many consecutive frames, stop the analysis
+        if session.consecutive_empty_frames >= session.max_empty_frames:
+            return {
+                "detection_complete": True,
+                "error": "No object in view",
+                "language": language
+            }, messages[language]["no_object_in_view"]
+    
+    session.frame_count += 1
+    
+    # Stop early once the posterior is confident enough
+    if rotation_decision and scores is not None:
+        rotation_decision.update(session.log_posterior, scores)
+        decided = rotation_decision.decide(session.log_posterior, session.frame_count)
+        if decided:
+            index, confidence = decided
+            payload, intro = object_verdict(session, object_labels[index])
+            payload["confidence"] = round(confidence, 4)
+            return payload, intro
+    
+    # target_frames is the hard cap, fall back to the plain vote there
+    if session.frame_count < session.target_frames:
+        return None
+    return final_verdict(session)
+
+def final_verdict(session: RotationState):
+    """Plain majority vote over the frames counted so far.
+
+    A session that ends before target_frames (a short clip) needs the same share of
+    votes, so detection_threshold is scaled down to the frames it actually saw. Below
+    MIN_VERDICT_FRAMES frames there is too little evidence for any verdict.
+    """
+    session_language = session.language
+    most_common_index, count = session.most_common()
+    if most_common_index is None:
+        return {
+            "detection_complete": False,
+            "error": "No object detected",
+            "language": session_language
+        }, messages[session_language]["no_object"]
+    
+    threshold = session.detection_threshold * min(1.0, session.frame_count / session.target_frames)
+    if count < threshold or session.frame_count < min(MIN_VERDICT_FRAMES, session.target_frames):
+        # Not confident enough
+        return {
+            "detection_complete": False,
+            "error": "Detection not confident enough",
+            "language": session_language
+        }, messages[session_language]["not_confident"]
+    
+    return object_verdict(session, object_labels[most_common_index])
+
+async def speak_bytes(text: str, language: str = 'en') -> bytes:
+    """Convert text to MP3 bytes in the TTS pool so synthesis never blocks the event loop"""
+    # Cached phrases are a dictionary lookup, so skip the pool round trip for them
+    cached = audio_cache.lookup(audio_cache.key(text, language))
+    if cached is not None:
+        metrics.inc("tts_calls_total", cache="hit")
+        return cached
+    metrics.inc("tts_calls_total", cache="miss")
     try:
-        tts = gTTS(text=text, lang=language)
-        buf = BytesIO()
-        tts.write_to_fp(buf)
-        buf.seek(0)
-        audio_bytes = buf.read()
-        return base64.b64encode(audio_bytes).decode("utf-8")
+        with metrics.span("tts"):
+            return await tts_pool.run(audio_cache.get, text, language)
     except Exception as e:
-        print(f"TTS Error: {e}")
-        return ""
+        print(f"TTS Error: {e or 'timed out'}")
+        metrics.inc("tts_failures_total")
+        return b""
+
+async def speak_async(text: str, language: str = 'en') -> str:
+    """Convert text to speech and return as base64 encoded audio"""
+    audio_bytes = await speak_bytes(text, language)
+    return base64.b64encode(audio_bytes).decode("utf-8")
+
+async def audio_fields(text: str, language: str = 'en', audio_format: str = "base64") -> dict:
+    """Response fields carrying the spoken audio: inline base64 by default, or a URL to fetch it from"""
+    if audio_format == "url":
+        # Registering writes the phrase file, keep that off the event loop
+        audio_id = await asyncio.to_thread(audio_cache.register, text, language)
+        return {"audio_id": audio_id, "audio_url": f"/audio/{audio_id}"}
+    return {"audio": await speak_async(text, language)}
+
+async def stream_speech(text: str, language: str):
+    """Stream MP3 chunks from the TTS pool as the backend produces them"""
+    metrics.inc("tts_calls_total", cache="stream")
+    chunks = audio_cache.stream(text, language)
+    while True:
+        chunk = await tts_pool.run(next, chunks, None)
+        if chunk is None:
+            break
+        yield chunk
+
+async def run_guarded(job):
+    """Await a pooled decode/inference job, turning overload and timeouts into HTTP errors"""
+    try:
+        return await job
+    except PoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Processing timed out")
+
+ADDRESS_PREFIX = "addr:"
+
+def client_key(client, *ids) -> str:
+    """First id the client sent (session id form field or header), else its address"""
+    return next((i for i in ids if i), None) or f"{ADDRESS_PREFIX}{client.host if client else 'default'}"
+
+@asynccontextmanager
+async def admitted(client_id: str):
+    """Hold a processing slot for one client frame, turning overload into fast HTTP errors.
+
+    Busy frames get 429 and superseded frames 409. Frame-streaming clients should
+    treat both as a skipped frame rather than a failure.
+    """
+    try:
+        async with admission.slot(client_id, shared=client_id.startswith(ADDRESS_PREFIX)):
+            yield
+    except AdmissionBusy as e:
+        metrics.inc("admission_rejected_total", reason="busy")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    except FrameSuperseded as e:
+        metrics.inc("admission_rejected_total", reason="superseded")
+        raise HTTPException(status_code=409, detail=str(e))
+
+def features_paused(client_id: str) -> bool:
+    deadline = feature_pauses.get(client_id)
+    if deadline is not None and deadline < time.monotonic():
+        del feature_pauses[client_id]
+        return False
+    return deadline is not None
+
+async def predict_frame(batcher: InferenceBatcher, img, conf: float, imgsz: int = INFERENCE_SIZE):
+    """Run one frame through a model's batcher, recording stage timings and frame counters"""
+    with metrics.span("predict", model=batcher.name):
+        results = await run_guarded(batcher.predict(img, imgsz=imgsz, conf=conf, device=models.device))
+    # Per-frame preprocess / forward pass / postprocess (NMS) times as measured by ultralytics
+    for stage, ms in results.speed.items():
+        if ms is not None:
+            metrics.record_stage(stage, ms / 1000, model=batcher.name)
+    metrics.inc("frames_processed_total", model=batcher.name)
+    if not results.boxes:
+        metrics.inc("empty_frames_total", model=batcher.name)
+    return results
+
+VERDICT_OUTCOMES = {
+    "No object in view": "no_object_in_view",
+    "No object detected": "no_object",
+    "Detection not confident enough": "not_confident"
+}
+
+def record_verdict(payload: dict):
+    outcome = "object" if "object" in payload else VERDICT_OUTCOMES.get(payload.get("error"), "error")
+    metrics.inc("rotation_verdicts_total", outcome=outcome)
+    if outcome != "object":
+        metrics.inc("inconclusive_verdicts_total")
+
+FRAME_FIELDS = ("frame_format", "width", "height", "orig_width", "orig_height")
+
+async def read_frame(contents: bytes, frame_format: str = "jpeg", width: int = None, height: int = None,
+                     orig_width: int = None, orig_height: int = None):
+    """Turn an encoded or raw uploaded frame into (image, scale back to original-frame pixels)"""
+    try:
+        if frame_format in RAW_CHANNELS:
+            # Wrapping a raw buffer is just a view, no need for the decode pool
+            return wrap_raw_frame(contents, width, height, frame_format, orig_width, orig_height)
+        with metrics.span("decode"):
+            return await run_guarded(decode_pool.run(decode_frame, contents, INFERENCE_SIZE))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def uploaded_frame(
+    file: UploadFile = File(...),
+    frame_format: str = Form("jpeg"),
+    width: int = Form(None),
+    height: int = Form(None),
+    orig_width: int = Form(None),
+    orig_height: int = Form(None)
+):
+    """Form fields shared by every frame endpoint: a JPEG/PNG upload, or a raw
+    bgr/rgb/gray uint8 buffer described by width/height (and optionally the
+    orig_width/orig_height it was resized from). Pass the result to read_frame()."""
+    contents = await file.read()
+    started = request_started.get()
+    if started is not None:
+        # Receiving the body and parsing the multipart form both happen before this point
+        metrics.record_stage("upload", time.perf_counter() - started)
+    return {
+        "contents": contents,
+        "frame_format": frame_format,
+        "width": width,
+        "height": height,
+        "orig_width": orig_width,
+        "orig_height": orig_height
+    }
+
+prerender_task = None
+
+def register_static_phrases():
+    for text, language in static_phrases():
+        audio_cache.register(text, language)
+
+@app.on_event("startup")
+async def warm_audio_cache():
+    """Pre-render static phrases in the background when TTS_PRERENDER=1"""
+    global prerender_task
+    await asyncio.to_thread(register_static_phrases)
+    if os.getenv("TTS_PRERENDER", "0") == "1":
+        prerender_task = asyncio.create_task(asyncio.to_thread(audio_cache.prerender, list(static_phrases())))
 
 @app.get("/")
 async def root():
@@ -181,232 +507,471 @@ async def root():
 #     })
 
 @app.post("/start-rotation-detection/")
-async def start_rotation_detection(session_data: dict):
+async def start_rotation_detection(session_data: dict, request: Request):
     """Initialize rotation-based object detection session"""
-    session_id = session_data.get("session_id", str(int(time.time())))
-    rotation_sessions[session_id] = create_new_session(session_id)
+    require_model("object_model")
+    session_id = client_key(request.client, session_data.get("session_id"))
+    await rotation_store.create(session_id, create_new_session(session_data.get("language", "en")))
     
-    audio = speak_as_base64(" please hold and slowly rotate the object for analysis.")
     return JSONResponse({
         "session_id": session_id,
         "message": "Rotation detection started",
-        "audio": audio
+        **await audio_fields(messages["en"]["rotation_start"], "en", session_data.get("audio_format", "base64"))
     })
 
 @app.post("/detect-object-rotation/")
-async def detect_object_rotation(file: UploadFile = File(...), language: str = Form("en")):
+async def detect_object_rotation(
+    request: Request,
+    frame: dict = Depends(uploaded_frame),
+    language: str = Form("en"),
+    session_id: str = Form(None),
+    audio_format: str = Form("base64"),
+    x_session_id: str = Header(None)
+):
     """Process single frame during rotation detection"""
-    if not object_model:
-        raise HTTPException(status_code=500, detail="Object model not loaded")
+    object_batcher = require_model("object_model")
     
-    # Get session_id from form data or headers
-    session_id = "default"
-    
-    if session_id not in rotation_sessions:
-        rotation_sessions[session_id] = {
-            "label_counts": collections.Counter(),
-            "frame_count": 0,
-            "target_frames": 50,
-            "detection_threshold": 26,
-            "language": language,
-            "consecutive_empty_frames": 0  # Add counter for frames with no detection
-        }
-    
-    session = rotation_sessions[session_id]
+    # Session from form data or headers, clients that send neither get one per address
+    session_id = client_id = client_key(request.client, session_id, x_session_id)
     
     try:
-        contents = await file.read()
-        img = cv2.imdecode(np.frombuffer(contents, np.uint8), cv2.IMREAD_COLOR)
-        
-        results = object_model.predict(img, imgsz=640, conf=0.5, device=device)[0]
+        async with admitted(client_id):
+            img, scale = await read_frame(**frame)
+            results = await predict_frame(object_batcher, img, 0.5)
+        detected_label, bounding_box = top_detection(results, object_batcher.model.names, scale)
+        scores = class_confidences(results, len(object_labels))
         
-        detected_label = None
-        bounding_box = None
-        
-        if results.boxes:
-            box = results.boxes[0]
-            cls_id = int(box.cls[0])
-            label_raw = object_model.names[cls_id]
-            label = label_raw.strip().lower().replace(" ", "_")
-            session["label_counts"][label] += 1
-            detected_label = label
-            session["consecutive_empty_frames"] = 0  # Reset counter when object detected
-            
-            # Get bounding box coordinates
-            x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
-            bounding_box = {"x1": x1, "y1": y1, "x2": x2, "y2": y2}
-        else:
-            session["consecutive_empty_frames"] += 1  # Increment counter when no object detected
-            
-            # If no object detected for 15 consecutive frames, stop the analysis
-            if session["consecutive_empty_frames"] >= 15:
-                message = "No object detected. Please show an object and try again." if language == "en" else "කිසිදු වස්තුවක් හඳුනා නොගැනිණි. කරුණාකර වස්තුවක් පෙන්වා නැවත උත්සාහ කරන්න."
-                audio_b64 = speak_as_base64(message, language)
-                del rotation_sessions[session_id]  # Clean up session
-                return JSONResponse({
-                    "detection_complete": True,
-                    "error": "No object in view",
-                    "audio": audio_b64,
-                    "language": language
-                })
-        
-        session["frame_count"] += 1
-        
-        # Check if we have enough frames for confident detection
-        if session["frame_count"] >= session["target_frames"]:
-            if session["label_counts"]:
-                most_common_label, count = session["label_counts"].most_common(1)[0]
-                if count >= session["detection_threshold"]:
-                    # Get description in correct language
-                    intro = introductions[session["language"]].get(
-                        most_common_label,
-                        f"This is a {most_common_label.replace('_', ' ')}." if session["language"] == "en" else f"මෙය {most_common_label.replace('_', ' ')} එකකි."
-                    )
-                    
-                    # Generate audio in correct language
-                    audio_b64 = speak_as_base64(intro, session["language"])
-                    
-                    # Clean up session
-                    del rotation_sessions[session_id]
-                    
-                    # Return response with language-specific messages
-                    next_step = "Press T to start feature detection" if session["language"] == "en" else "ලක්ෂණ හඳුනා ගැනීම ආරම්භ කිරීමට T යතුර ඔබන්න"
-                    
-                    return JSONResponse({
-                        "object": most_common_label,
-                        "description": intro,
-                        "detection_complete": True,
-                        "audio": audio_b64,
-                        "next_step": next_step,
-                        "language": session["language"],
-                        "bounding_box": bounding_box
-                    })
-                else:
-                    # Not confident enough
-                    del rotation_sessions[session_id]
-                    message = "Detection not confident. Please rotate the object again." if session["language"] == "en" else "හඳුනා ගැනීම ස්ථිර නැත. කරුණාකර වස්තුව නැවත කරකවන්න."
-                    audio_b64 = speak_as_base64(message, session["language"])
-                    return JSONResponse({
-                        "detection_complete": False,
-                        "error": "Detection not confident enough",
-                        "audio": audio_b64,
-                        "language": session["language"]
-                    })
-            else:
-                del rotation_sessions[session_id]
-                message = "No object detected. Please try again." if session["language"] == "en" else "කිසිදු වස්තුවක් හඳුනා නොගැනිණි. කරුණාකර නැවත උත්සාහ කරන්න."
-                audio_b64 = speak_as_base64(message, session["language"])
-                return JSONResponse({
-                    "detection_complete": False,
-                    "error": "No object detected",
-                    "audio": audio_b64,
-                    "language": session["language"]
-                })
+        # The store drops the session as soon as advance_rotation returns a verdict
+        session, verdict = await rotation_store.update(
+            session_id,
+            lambda state: advance_rotation(state, detected_label, language, scores),
+            lambda: create_new_session(language)
+        )
+        if verdict:
+            payload, message = verdict
+            record_verdict(payload)
+            payload.update(await audio_fields(message, payload["language"], audio_format))
+            if "object" in payload:
+                payload["bounding_box"] = bounding_box
+            return JSONResponse(payload)
         
         # Still collecting frames
         return JSONResponse({
             "detection_complete": False,
-            "frame_count": session["frame_count"],
-            "target_frames": session["target_frames"],
+            "frame_count": session.frame_count,
+            "target_frames": session.target_frames,
             "current_detection": detected_label,
             "bounding_box": bounding_box,
-            "progress": session["frame_count"] / session["target_frames"],
-            "language": session["language"]
+            "progress": session.frame_count / session.target_frames,
+            "language": session.language
         })
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Detection error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.websocket("/ws/detect-object-rotation")
+async def detect_object_rotation_stream(websocket: WebSocket, language: str = "en"):
+    """Stream rotation frames over one connection.
+
+    The client sends each frame as a binary JPEG message and gets back a compact
+    progress message per frame. When the vote settles the server sends the verdict
+    as JSON followed by the spoken audio as one binary MP3 message, then starts a
+    fresh session on the same connection. A text message {"language": "si"} or
+    {"reset": true} changes the language or restarts the current session. Raw
+    frames are announced with {"frame_format": "bgr", "width": ..., "height": ...}.
+    """
+    await websocket.accept()
+    try:
+        object_batcher = models.batcher("object_model")
+    except ModelNotReady as e:
+        await websocket.send_json({"error": str(e)})
+        await websocket.close(code=1013)  # try again later
+        return
+
+    session = create_new_session(language)
+    frame_meta = {}
+    client_id = client_key(websocket.client, websocket.query_params.get("session_id"))
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+
+            if message.get("text") is not None:
+                try:
+                    control = json.loads(message["text"])
+                    if not isinstance(control, dict):
+                        raise ValueError("expected a JSON object")
+                except ValueError as e:
+                    # A bad control message is the client's mistake, the session carries on
+                    await websocket.send_json({"error": f"Invalid control message: {e}"})
+                    continue
+                language = control.get("language", language)
+                frame_meta.update({k: control[k] for k in FRAME_FIELDS if k in control})
+                if control.get("reset") or "language" in control:
+                    session = create_new_session(language)
+                continue
+
+            try:
+                async with admitted(client_id):
+                    img, scale = await read_frame(message["bytes"], **frame_meta)
+                    results = await predict_frame(object_batcher, img, 0.5)
+            except HTTPException as e:
+                # Busy or superseded frames are skipped, the client just sends the next one
+                await websocket.send_json({"error": e.detail, "status": e.status_code})
+                continue
+            except Exception as e:
+                await websocket.send_json({"error": str(e)})
+                continue
+
+            label, bounding_box = top_detection(results, object_batcher.model.names, scale)
+            verdict = advance_rotation(session, label, language, class_confidences(results, len(object_labels)))
+            if verdict:
+                payload, text = verdict
+                record_verdict(payload)
+                if "object" in payload:
+                    payload["bounding_box"] = bounding_box
+                await websocket.send_json(payload)
+                await websocket.send_bytes(await speak_bytes(text, payload["language"]))
+                session = create_new_session(language)
+                continue
+
+            await websocket.send_json({
+                "label": label,
+                "bbox": [bounding_box[k] for k in ("x1", "y1", "x2", "y2")] if bounding_box else None,
+                "progress": session.frame_count / session.target_frames
+            })
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Rotation stream error: {e}")
+        await websocket.close(code=1011)
+
 @app.post("/detect-object/")
-async def detect_object(file: UploadFile = File(...)):
-    """Simple object detection (original functionality)"""
-    if not object_model:
-        raise HTTPException(status_code=500, detail="Object model not loaded")
+async def detect_object(
+    request: Request,
+    frame: dict = Depends(uploaded_frame),
+    mode: str = Form("single"),
+    audio_format: str = Form("base64"),
+    session_id: str = Form(None),
+    x_session_id: str = Header(None)
+):
+    """Simple object detection, either one pass ("single") or test-time augmentation ("tta")"""
+    object_batcher = require_model("object_model")
+    if mode not in ("single", "tta"):
+        raise HTTPException(status_code=400, detail="mode must be 'single' or 'tta'")
     
     try:
-        contents = await file.read()
-        img = cv2.imdecode(np.frombuffer(contents, np.uint8), cv2.IMREAD_COLOR)
-        
-        label_counts = collections.Counter()
-        for _ in range(20):  # Reduced from 40
-            results = object_model.predict(img, imgsz=640, conf=0.5, device=device)[0]
-            if results.boxes:
-                cls_id = int(results.boxes[0].cls[0])
-                label = object_model.names[cls_id].strip().lower().replace(" ", "_")
-                label_counts[label] += 1
+        async with admitted(client_key(request.client, session_id, x_session_id)):
+            img, _ = await read_frame(**frame)
+            views = await run_guarded(decode_pool.run(augmented_views, img)) if mode == "tta" else [img]
+            
+            # Views are queued together so the batcher runs them in a single forward pass
+            results_list = await asyncio.gather(*[
+                predict_frame(object_batcher, view, 0.5) for view in views
+            ])
+        class_scores = weighted_vote(results_list, object_batcher.model.names)
         
-        if label_counts:
-            detected_label, count = label_counts.most_common(1)[0]
+        if class_scores:
+            detected_label = next(iter(class_scores))
             intro = introductions.get(detected_label, f"This is a {detected_label}.")
             full_message = f"You are holding a {detected_label.replace('_', ' ')}. {intro}"
-            audio_b64 = speak_as_base64(full_message)
             return JSONResponse({
                 "object": detected_label,
                 "description": intro,
                 "full_message": full_message,
-                "audio": audio_b64
+                **await audio_fields(full_message, "en", audio_format),
+                "mode": mode,
+                "class_scores": class_scores,
+                "views_used": len(views)
             })
         else:
             return JSONResponse(status_code=400, content={"error": "No object confidently detected"})
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Detection error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
+CLIP_MAX_BYTES = int(os.getenv("CLIP_MAX_BYTES", str(100 * 1024 * 1024)))
+CLIP_MAX_FRAME_BYTES = int(os.getenv("CLIP_MAX_FRAME_BYTES", str(20 * 1024 * 1024)))
+
+def upload_size(file: UploadFile) -> int:
+    """Size of an upload Starlette has already spooled, without reading it"""
+    file.file.seek(0, os.SEEK_END)
+    size = file.file.tell()
+    file.file.seek(0)
+    return size
+
+async def spool_upload(file: UploadFile, suffix: str) -> str:
+    """Copy an upload to a temporary file in chunks (OpenCV only opens videos by path)"""
+    handle = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+    try:
+        size = 0
+        while chunk := await file.read(1 << 20):
+            size += len(chunk)
+            if size > CLIP_MAX_BYTES:
+                raise HTTPException(status_code=413, detail=f"Clip is larger than {CLIP_MAX_BYTES} bytes")
+            handle.write(chunk)
+        handle.close()
+    except BaseException:
+        handle.close()
+        os.remove(handle.name)
+        raise
+    return handle.name
+
+@app.post("/analyze-rotation-clip/")
+async def analyze_rotation_clip(
+    request: Request,
+    file: UploadFile = File(None),
+    frames: list[UploadFile] = File(None),
+    language: str = Form("en"),
+    stride: int = Form(0),
+    audio_format: str = Form("base64"),
+    session_id: str = Form(None),
+    x_session_id: str = Header(None)
+):
+    """Analyze a recorded rotation in one request instead of one request per frame.
+
+    Send a video clip or a zip of frames as "file", or the frames as repeated "frames"
+    parts. Every stride-th frame is decoded and run through the object model a batch
+    at a time (stride 0 spreads target_frames over the clip), and the frames are voted
+    on exactly like live rotation frames, so memory does not grow with the clip length.
+    """
+    object_batcher = require_model("object_model")
+    if not file and not frames:
+        raise HTTPException(status_code=400, detail="No clip or frames provided")
+    if stride < 0:
+        raise HTTPException(status_code=400, detail="stride must be 0 (automatic) or positive")
+    
+    # Zips and frame parts are spooled by Starlette before we see them, so check their sizes up front
+    sizes = [upload_size(f) for f in frames] if frames else []
+    if sum(sizes) > CLIP_MAX_BYTES or (file and not frames and upload_size(file) > CLIP_MAX_BYTES):
+        raise HTTPException(status_code=413, detail=f"Clip is larger than {CLIP_MAX_BYTES} bytes")
+    if any(size > CLIP_MAX_FRAME_BYTES for size in sizes):
+        raise HTTPException(status_code=413, detail=f"A frame is larger than {CLIP_MAX_FRAME_BYTES} bytes")
+    
+    session = create_new_session(language)
+    video_path = None
+    try:
+        async with admitted(client_key(request.client, session_id, x_session_id)):
+            if frames:
+                stride, clip = image_frames([f.file for f in frames], stride, session.target_frames, INFERENCE_SIZE)
+            elif zipfile.is_zipfile(file.file):
+                stride, clip = await asyncio.to_thread(
+                    zip_frames, file.file, stride, session.target_frames, INFERENCE_SIZE, CLIP_MAX_FRAME_BYTES
+                )
+            else:
+                await file.seek(0)  # is_zipfile leaves the file at its end
+                video_path = await spool_upload(file, os.path.splitext(file.filename or "")[1] or ".mp4")
+                stride, clip = await asyncio.to_thread(video_frames, video_path, stride, session.target_frames, INFERENCE_SIZE)
+            
+            detections, verdict = [], None
+            try:
+                while verdict is None:
+                    batch = await asyncio.to_thread(take, clip, object_batcher.max_batch_size)
+                    if not batch:
+                        break
+                    # Queued together so the batcher runs the whole batch in one forward pass
+                    results_list = await asyncio.gather(*[
+                        predict_frame(object_batcher, img, 0.5) for _, img, _ in batch
+                    ])
+                    for (index, _, scale), results in zip(batch, results_list):
+                        label, bounding_box = top_detection(results, object_batcher.model.names, scale)
+                        detections.append({"frame": index, "label": label, "bounding_box": bounding_box})
+                        verdict = advance_rotation(session, label, language, class_confidences(results, len(object_labels)))
+                        if verdict:
+                            break
+            finally:
+                clip.close()
+        
+        if not detections:
+            raise HTTPException(status_code=400, detail="No frames could be read from the clip")
+        payload, message = verdict or final_verdict(session)  # the clip ended before the vote settled
+        record_verdict(payload)
+        payload.update({
+            "frames": detections,
+            "frames_analyzed": len(detections),
+            "stride": stride,
+            **await audio_fields(message, payload["language"], audio_format)
+        })
+        return JSONResponse(payload)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Clip analysis error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        if video_path:
+            os.remove(video_path)
+
+def first_detection(results, offset=(0, 0)):
+    """(cls_id, confidence, xyxy) of the first box, shifted by the crop offset, or None"""
+    if not results.boxes:
+        return None
+    box = results.boxes[0]
+    x1, y1, x2, y2 = box.xyxy[0].tolist()
+    dx, dy = offset
+    return int(box.cls[0]), float(box.conf[0]), (x1 + dx, y1 + dy, x2 + dx, y2 + dy)
+
+async def detect_touch(touch_batcher: InferenceBatcher, img, client_id: str):
+    """Touch detection for one frame, through the temporal gate when it is enabled.
+
+    Returns (detection, source) where source is "cache", "roi" or "full".
+    """
+    if touch_gate is None:
+        return first_detection(await predict_frame(touch_batcher, img, 0.3)), "full"
+
+    source, value, signature = touch_gate.plan(client_id, img)
+    if source == "cache":
+        detection = value
+    elif source == "roi":
+        x1, y1, x2, y2 = value
+        # Crops run at their own size, so the hand is seen at the same scale as in the full frame
+        results = await predict_frame(touch_batcher, img[y1:y2, x1:x2], 0.3, imgsz=max(x2 - x1, y2 - y1))
+        detection = first_detection(results, (x1, y1))
+        if detection is None:
+            # Lost the hand around its last position, look at the whole frame instead
+            source = "full"
+    if source == "full":
+        detection = first_detection(await predict_frame(touch_batcher, img, 0.3))
+    if source != "cache":
+        touch_gate.record(client_id, signature, detection, source)
+    metrics.inc("touch_frames_total", source=source)
+    return detection, source
+
 @app.post("/detect-feature/")
-async def detect_feature(file: UploadFile = File(...), language: str = Form("en")):
+async def detect_feature(
+    request: Request,
+    frame: dict = Depends(uploaded_frame),
+    language: str = Form("en"),
+    session_id: str = Form(None),
+    x_session_id: str = Header(None)
+):
     """Detect touched features on the object"""
-    global is_processing_feature
-    
-    if not touch_model:
-        raise HTTPException(status_code=500, detail="Touch model not loaded")
+    touch_batcher = require_model("touch_model")
+    client_id = client_key(request.client, session_id, x_session_id)
     
     try:
-        # If currently processing a feature, return no detection
-        if is_processing_feature:
+        # If this client is currently announcing a feature, return no detection
+        if features_paused(client_id):
             return JSONResponse({"feature": None, "is_processing": True})
             
-        contents = await file.read()
-        img = cv2.imdecode(np.frombuffer(contents, np.uint8), cv2.IMREAD_COLOR)
-        
-        results = touch_model.predict(img, imgsz=640, conf=0.3, device=device)[0]
-        if results.boxes:
-            cls_id = int(results.boxes[0].cls[0])
-            label_raw = touch_model.names[cls_id]
+        async with admitted(client_id):
+            img, scale = await read_frame(**frame)
+            detection, source = await detect_touch(touch_batcher, img, client_id)
+        if detection:
+            cls_id, confidence, xyxy = detection
+            label_raw = touch_batcher.model.names[cls_id]
             label = label_raw.strip().lower()
             
             # Get feature info from translations
             feature_info = feature_translations[language].get(label, {"name": label, "description": ""})
             
-            # Get bounding box for visualization
-            box = results.boxes[0]
-            x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
-            
             return JSONResponse({
                 "feature": label,  # Return the raw feature name for frontend processing
                 "feature_name": feature_info["name"],  # Return translated name
                 "description": feature_info["description"],  # Return description
-                "bounding_box": {"x1": x1, "y1": y1, "x2": x2, "y2": y2},
-                "confidence": float(box.conf[0]),
+                "bounding_box": scale_box(xyxy, scale),  # For visualization
+                "confidence": confidence,
+                "source": source,
                 "is_processing": False
             })
-        return JSONResponse({"feature": None, "is_processing": False})
+        return JSONResponse({"feature": None, "source": source, "is_processing": False})
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Feature detection error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
+# Both models at once only pays off when they do not have to share a single core
+COMBINED_CONCURRENT = os.getenv("COMBINED_CONCURRENT", "1" if (os.cpu_count() or 1) > 1 else "0") == "1"
+
+@app.post("/analyze-frame/")
+async def analyze_frame(
+    request: Request,
+    frame: dict = Depends(uploaded_frame),
+    language: str = Form("en"),
+    session_id: str = Form(None),
+    x_session_id: str = Header(None)
+):
+    """Detect the held object and the touched feature from one upload.
+
+    The frame is decoded and letterboxed once, and both models run on that same image
+    (concurrently when there are spare cores) instead of the client sending it to
+    /detect-object/ and /detect-feature/ separately.
+    """
+    object_batcher = require_model("object_model")
+    touch_batcher = require_model("touch_model")
+    client_id = client_key(request.client, session_id, x_session_id)
+    paused = features_paused(client_id)
+    
+    try:
+        async with admitted(client_id):
+            img, scale = await read_frame(**frame)
+            boxed, ratio, pad = letterbox(img, INFERENCE_SIZE)
+            
+            object_job = predict_frame(object_batcher, boxed, 0.5)
+            # The touch gate tracks letterboxed coordinates, so it gets its own entry for this endpoint
+            touch_job = None if paused else detect_touch(touch_batcher, boxed, f"{client_id}:analyze")
+            if paused:
+                object_results, touch = await object_job, (None, None)
+            elif COMBINED_CONCURRENT:
+                object_results, touch = await asyncio.gather(object_job, touch_job)
+            else:
+                object_results, touch = await object_job, await touch_job
+        
+        payload = {"object": None, "feature": None, "is_processing": paused}
+        detection = first_detection(object_results)
+        if detection:
+            cls_id, confidence, xyxy = detection
+            payload.update({
+                "object": object_batcher.model.names[cls_id].strip().lower().replace(" ", "_"),
+                "object_bounding_box": scale_box(unletterbox(xyxy, ratio, pad, img.shape), scale),
+                "object_confidence": confidence
+            })
+        
+        detection, source = touch
+        if detection:
+            cls_id, confidence, xyxy = detection
+            label = touch_batcher.model.names[cls_id].strip().lower()
+            feature_info = feature_translations[language].get(label, {"name": label, "description": ""})
+            payload.update({
+                "feature": label,
+                "feature_name": feature_info["name"],
+                "description": feature_info["description"],
+                "feature_bounding_box": scale_box(unletterbox(xyxy, ratio, pad, img.shape), scale),
+                "feature_confidence": confidence
+            })
+        if source:
+            payload["feature_source"] = source
+        return JSONResponse(payload)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Frame analysis error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/start-feature-announcement/")
-async def start_feature_announcement():
-    """Start the feature announcement process"""
-    global is_processing_feature
-    is_processing_feature = True
+async def start_feature_announcement(request: Request, session_id: str = Form(None), x_session_id: str = Header(None)):
+    """Start the feature announcement process (pauses feature detection for this client only).
+
+    The client is identified like on /detect-feature/: session_id form field, then
+    X-Session-Id header, then its address.
+    """
+    now = time.monotonic()
+    for client_id in [c for c, deadline in feature_pauses.items() if deadline < now]:
+        del feature_pauses[client_id]
+    feature_pauses[client_key(request.client, session_id, x_session_id)] = now + FEATURE_PAUSE_MAX_S
     return JSONResponse({"status": "started"})
 
 @app.post("/end-feature-announcement/")
-async def end_feature_announcement():
+async def end_feature_announcement(request: Request, session_id: str = Form(None), x_session_id: str = Header(None)):
     """End the feature announcement process"""
-    global is_processing_feature
-    is_processing_feature = False
+    feature_pauses.pop(client_key(request.client, session_id, x_session_id), None)
     return JSONResponse({"status": "ended"})
 
 @app.post("/speak-feature/")
@@ -418,15 +983,14 @@ async def speak_feature(data: dict):
     
     try:
         if is_next_instruction:
-            text = "Please move to the next feature" if language == "en" else "කරුණාකර ඊළඟ ලක්ෂණයට යන්න"
+            text = messages[language]["next_feature"]
         else:
             # Get translated feature name and description
             feature_info = feature_translations[language].get(feature, {"name": feature, "description": ""})
             text = feature_info["description"] if feature_info["description"] else f"You touched a {feature_info['name']}"
         
-        audio_b64 = speak_as_base64(text, language)
         return JSONResponse({
-            "audio": audio_b64,
+            **await audio_fields(text, language, data.get("audio_format", "base64")),
             "text": text
         })
     except Exception as e:
@@ -436,14 +1000,59 @@ async def speak_feature(data: dict):
 @app.get("/models/status")
 async def get_models_status():
     """Check if models are loaded properly"""
+    object_slot, touch_slot = models.slots["object_model"], models.slots["touch_model"]
     return JSONResponse({
-        "object_model_loaded": object_model is not None,
-        "touch_model_loaded": touch_model is not None,
-        "device": device if 'device' in globals() else "unknown",
-        "object_classes": object_model.names if object_model else {},
-        "touch_classes": touch_model.names if touch_model else {}
+        "object_model_loaded": models.is_ready("object_model"),
+        "touch_model_loaded": models.is_ready("touch_model"),
+        "models": models.status(),
+        "device": models.device or "unknown",
+        "object_classes": object_slot.model.names if object_slot.model else {},
+        "touch_classes": touch_slot.model.names if touch_slot.model else {},
+        "pools": {pool.name: pool.status() for pool in (decode_pool, inference_pool, tts_pool)},
+        "audio_cache": audio_cache.status(),
+        "touch_gate": touch_gate.status() if touch_gate else None,
+        "admission": admission.status(),
+        "rotation_sessions": await rotation_store.count()
     })
 
+@app.get("/health/live")
+async def liveness():
+    """The process is up and serving requests (models may still be loading)"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """200 once every model is loaded and warmed up, 503 while loading or after a load failure"""
+    states = {name: slot.state for name, slot in models.slots.items()}
+    return JSONResponse(status_code=200 if models.ready else 503, content={"ready": models.ready, "models": states})
+
+@app.post("/models/{name}/swap")
+async def swap_model(name: str, data: dict, x_admin_token: str = Header(None)):
+    """Hot-swap a model to new weights without restarting.
+
+    Body: {"weights": "yolo_models/object_model_v2.pt", "engine": "onnx", "precision": "fp32"}
+    (engine and precision default to the current ones). Disabled unless MODEL_ADMIN_TOKEN is
+    set and sent back in the X-Admin-Token header, since loading a checkpoint can run arbitrary code.
+    """
+    admin_token = os.getenv("MODEL_ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=403, detail="Model swapping is disabled (MODEL_ADMIN_TOKEN is not set)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    if name not in models.slots:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {name}")
+    if not data.get("weights"):
+        raise HTTPException(status_code=400, detail="No weights provided")
+
+    try:
+        status = await models.swap(name, data["weights"], data.get("engine"), data.get("precision"))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        print(f"Model swap error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse({"model": name, **status})
+
 @app.post("/speak/")
 async def speak_text(data: dict):
     """Convert any text to speech"""
@@ -453,11 +1062,56 @@ async def speak_text(data: dict):
     if not text:
         return JSONResponse(status_code=400, content={"error": "No text provided"})
     
-    audio_b64 = speak_as_base64(text, language)
-    return JSONResponse({"audio": audio_b64})
+    return JSONResponse(await audio_fields(text, language, data.get("audio_format", "base64")))
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition of request, stage, frame, session and TTS metrics"""
+    metrics.set_gauge("rotation_sessions_live", await rotation_store.count())
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+AUDIO_ID = re.compile(r"^[0-9a-f]{64}$")
+
+@app.get("/audio/{audio_id}")
+async def get_audio(audio_id: str, if_none_match: str = Header(None)):
+    """Serve spoken audio as raw audio/mpeg, streamed while it is being synthesized.
+
+    Ids are content hashes of (voice, language, text), so the bytes behind an id never
+    change: cached clips get an ETag and a year-long immutable Cache-Control.
+    """
+    if not AUDIO_ID.match(audio_id) or not audio_cache.known(audio_id):
+        raise HTTPException(status_code=404, detail="Unknown audio id")
+    
+    etag = f'"{audio_id}"'
+    cache_headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=cache_headers)
+    
+    audio = audio_cache.lookup(audio_id)
+    if audio is not None:
+        return Response(audio, media_type="audio/mpeg", headers=cache_headers)
+    
+    phrase = audio_cache.phrase(audio_id)
+    if phrase is None:
+        raise HTTPException(status_code=404, detail="Unknown audio id")
+    # Not cached yet: stream it as it is produced, and let the client revalidate for the cached copy
+    return StreamingResponse(
+        stream_speech(*phrase),
+        media_type="audio/mpeg",
+        headers={"ETag": etag, "Cache-Control": "no-cache"}
+    )
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    import argparse
+    parser = argparse.ArgumentParser(description="3D Object Teaching API")
+    parser.add_argument("--prerender", action="store_true", help="render every static phrase into the audio cache and exit")
+    args = parser.parse_args()
+
+    if args.prerender:
+        failed = audio_cache.prerender(static_phrases())
+        print(f"Audio cache pre-render finished ({failed} failed): {audio_cache.status()}")
+    else:
+        import uvicorn
+        uvicorn.run(app, host="0.0.0.0", port=8000)
 
 
@@ -0,0 +1,156 @@
+import bisect
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Latency buckets in seconds, from a cached TTS lookup up to a stalled request
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Stage timings of the current request, set by the Server-Timing middleware when it is enabled
+request_timings = contextvars.ContextVar("request_timings", default=None)
+
+# perf_counter() when the current request reached the app, before its body was read
+request_started = contextvars.ContextVar("request_started", default=None)
+
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Counters, gauges and histograms rendered in the Prometheus text format.
+
+    Every update is a dictionary lookup and an addition under one lock, cheap enough
+    to stay enabled on the hot path.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._gauge_callbacks = {}
+        self._help = {}
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._help[name] = (kind, help_text)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def gauge_callback(self, name: str, fn, **labels):
+        """Read a gauge from fn() at scrape time instead of tracking it on every change"""
+        self._gauge_callbacks[(name, _label_key(labels))] = fn
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def record_stage(self, stage: str, seconds: float, **labels):
+        """Record one stage duration, and add it to the Server-Timing header if this request wants one"""
+        self.observe("stage_duration_seconds", seconds, stage=stage, **labels)
+        timings = request_timings.get()
+        if timings is not None:
+            timings.append((stage, seconds))
+
+    @contextmanager
+    def span(self, stage: str, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(stage, time.perf_counter() - start, **labels)
+
+    def render(self) -> str:
+        for key, fn in self._gauge_callbacks.items():
+            try:
+                value = fn()
+            except Exception:
+                continue
+            with self._lock:
+                self._gauges[key] = value
+
+        lines = []
+        with self._lock:
+            families = {}
+            for (name, key), value in self._counters.items():
+                families.setdefault(name, []).append(f"{name}{_format_labels(key)} {value}")
+            for (name, key), value in self._gauges.items():
+                families.setdefault(name, []).append(f"{name}{_format_labels(key)} {value}")
+            for (name, key), histogram in self._histograms.items():
+                samples = families.setdefault(name, [])
+                cumulative = 0
+                for bound, count in zip(BUCKETS + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                    samples.append(f"{name}_bucket{_format_labels(key, le)} {cumulative}")
+                samples.append(f"{name}_sum{_format_labels(key)} {histogram.total}")
+                samples.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+
+        for name in sorted(families):
+            if name in self._help:
+                kind, help_text = self._help[name]
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+            lines.extend(families[name])
+        return "\n".join(lines) + "\n"
+
+
+def server_timing_header(timings: list) -> str:
+    """Format stage timings as a Server-Timing header value (durations in milliseconds)"""
+    totals = {}
+    for stage, seconds in timings:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items())
+
+
+metrics = MetricsRegistry()
+metrics.describe("http_request_duration_seconds", "histogram", "Request latency by route")
+metrics.describe("stage_duration_seconds", "histogram", "Time spent in each processing stage")
+metrics.describe("frames_processed_total", "counter", "Frames run through a model")
+metrics.describe("empty_frames_total", "counter", "Frames where the model found nothing")
+metrics.describe("touch_frames_total", "counter", "Touch frames by how they were answered (cache, roi or full)")
+metrics.describe("rotation_verdicts_total", "counter", "Finished rotation sessions by outcome")
+metrics.describe("inconclusive_verdicts_total", "counter", "Rotation sessions that ended without a confident object")
+metrics.describe("tts_calls_total", "counter", "Speech requests by cache result")
+metrics.describe("tts_failures_total", "counter", "Speech requests that returned no audio")
+metrics.describe("rotation_sessions_live", "gauge", "Rotation sessions currently stored")
+metrics.describe("admission_in_flight", "gauge", "Client frames holding a processing slot")
+metrics.describe("admission_rejected_total", "counter", "Client frames turned away, by reason (busy or superseded)")
+metrics.describe("inferences_in_flight", "gauge", "Frames queued or running in a model batcher")
@@ -0,0 +1,186 @@
+import asyncio
+import time
+
+from batching import InferenceBatcher
+from engines import ModelEngine, create_engine, exported_format
+
+
+class ModelNotReady(Exception):
+    """Raised when a request needs a model that is still loading or failed to load"""
+
+
+class ModelSlot:
+    """One named model: its engine, the batcher serving it and its load state"""
+
+    def __init__(self, engine: ModelEngine, batcher: InferenceBatcher):
+        self.engine = engine
+        self.batcher = batcher
+        self.state = "pending"  # pending -> loading -> ready | failed
+        self.error = None
+        self.ready_at = None
+        self.swaps = 0
+        self.swap_lock = asyncio.Lock()
+
+    @property
+    def model(self):
+        return self.batcher.model
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "error": self.error,
+            "weights": self.engine.weights,
+            "swaps": self.swaps,
+            **self.engine.status(),
+        }
+
+
+class ModelRegistry:
+    """Named YOLO models that load in the background once the server is up.
+
+    Until a model is ready, batcher() raises ModelNotReady. This lets a worker bind
+    and answer health checks straight away instead of blocking on torch and the
+    checkpoints. swap() loads and warms a replacement alongside the serving model,
+    then points the batcher at it. Batches already running finish on the old model.
+    """
+
+    def __init__(self, pool=None, warmup: bool = True, workers=None):
+        self.pool = pool
+        self.warmup = warmup
+        self.workers = workers  # InferenceWorkers when the models run in separate processes
+        self.slots = {}
+        self.device = None
+        self._ready_callbacks = {}
+        self._task = None
+
+    def add(self, name: str, weights: str, imgsz: int = 640):
+        # Each worker process can run a batch, so a model gets as many concurrent batches as there are workers
+        batcher = InferenceBatcher(None, name, pool=self.pool, max_concurrent=self.workers.size if self.workers else 1)
+        if self.workers is not None:
+            # A batch must fit in the frame ring, or it could never get its slots
+            batcher.max_batch_size = min(batcher.max_batch_size, self.workers.slot_count)
+        self.slots[name] = ModelSlot(create_engine(name, weights, imgsz), batcher)
+
+    def on_ready(self, name: str, callback):
+        """Call callback(model) whenever the named model becomes ready, including after a swap"""
+        self._ready_callbacks.setdefault(name, []).append(callback)
+
+    def start(self):
+        """Start the batchers and load every pending model in one background task"""
+        for slot in self.slots.values():
+            slot.batcher.start()
+        if self._task is None:
+            self._task = asyncio.create_task(self._load_all())
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        for slot in self.slots.values():
+            await slot.batcher.stop()
+        if self.workers is not None:
+            self.workers.shutdown()
+
+    async def wait_ready(self, timeout: float = None) -> bool:
+        """Start loading if needed and wait until no model is still loading"""
+        self.start()
+        await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        return self.ready
+
+    def _prepare(self, engine: ModelEngine):
+        """Load and warm one engine (runs in a worker thread)"""
+        if self.workers is not None:
+            model = self.workers.load(engine, self.warmup)
+            self.device = self.workers.device
+            return model
+        if self.device is None:
+            import torch
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        model = engine.load()
+        if self.warmup:
+            engine.warmup()
+        return model
+
+    def _activate(self, name: str, slot: ModelSlot, model):
+        previous, slot.batcher.model = slot.batcher.model, model
+        if previous is not None and hasattr(previous, "release"):
+            previous.release()
+        slot.state, slot.error, slot.ready_at = "ready", None, time.time()
+        for callback in self._ready_callbacks.get(name, ()):
+            callback(model)
+
+    async def _load_all(self):
+        # One model at a time, so the first one becomes ready without competing for the CPU
+        for name, slot in self.slots.items():
+            if slot.state != "pending":
+                continue
+            slot.state = "loading"
+            start = time.perf_counter()
+            try:
+                model = await asyncio.to_thread(self._prepare, slot.engine)
+            except Exception as e:
+                slot.state, slot.error = "failed", str(e)
+                print(f"Error loading {name}: {e}")
+                continue
+            self._activate(name, slot, model)
+            print(f"{name} loaded on {self.device} with {slot.engine.active_engine} "
+                  f"in {time.perf_counter() - start:.1f}s, class names: {model.names}")
+
+    def is_ready(self, name: str) -> bool:
+        slot = self.slots.get(name)
+        return slot is not None and slot.state == "ready"
+
+    @property
+    def ready(self) -> bool:
+        return all(slot.state == "ready" for slot in self.slots.values())
+
+    def batcher(self, name: str) -> InferenceBatcher:
+        """Batcher serving the named model, or ModelNotReady while it cannot serve"""
+        slot = self.slots[name]
+        if slot.state == "failed":
+            raise ModelNotReady(f"{name} failed to load: {slot.error}")
+        if slot.state != "ready":
+            raise ModelNotReady(f"{name} is still loading")
+        return slot.batcher
+
+    async def swap(self, name: str, weights: str, engine: str = None, precision: str = None) -> dict:
+        """Load new weights (a .pt checkpoint or an exported model) and switch the named model over to them.
+
+        The replacement must predict the same classes, since live rotation sessions
+        keep their votes indexed by class id. On any error the current model keeps serving.
+        """
+        slot = self.slots[name]
+        if slot.swap_lock.locked():
+            raise RuntimeError(f"{name} is already being swapped")
+        async with slot.swap_lock:
+            if slot.state in ("pending", "loading"):
+                raise RuntimeError(f"{name} is still loading")
+
+            current = slot.engine
+            if exported_format(weights):
+                # Already exported, so load it as is
+                engine, precision = "torch", "fp32"
+            candidate = ModelEngine(
+                name, weights,
+                engine=engine or current.engine,
+                precision=precision or current.precision,
+                imgsz=current.imgsz,
+                cache_dir=current.cache_dir,
+                int8_data=current.int8_data,
+            )
+            model = await asyncio.to_thread(self._prepare, candidate)
+            if slot.model is not None and dict(model.names) != dict(slot.model.names):
+                if hasattr(model, "release"):
+                    model.release()
+                raise ValueError(f"{weights} predicts different classes than the current {name}")
+
+            slot.engine = candidate
+            slot.swaps += 1
+            self._activate(name, slot, model)
+            print(f"{name} swapped to {weights} ({candidate.active_engine})")
+            return slot.status()
+
+    def status(self) -> dict:
+        status = {name: slot.status() for name, slot in self.slots.items()}
+        if self.workers is not None:
+            status["workers"] = self.workers.status()
+        return status
@@ -0,0 +1,207 @@
+import asyncio
+import os
+import struct
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class RotationState:
+    """Vote state of one rotation session, with one fixed-size counter and log posterior per object class"""
+
+    __slots__ = ("counts", "log_posterior", "frame_count", "target_frames", "detection_threshold",
+                 "consecutive_empty_frames", "max_empty_frames", "language")
+
+    # frame_count, target_frames, detection_threshold, consecutive_empty_frames, max_empty_frames, language
+    HEADER = struct.Struct("<HHHHH2s")
+
+    def __init__(self, num_classes: int, language: str = "en", target_frames: int = 50,
+                 detection_threshold: int = 26, max_empty_frames: int = 15):
+        self.counts = np.zeros(num_classes, dtype=np.int32)
+        self.log_posterior = np.zeros(num_classes, dtype=np.float64)  # uniform prior
+        self.frame_count = 0
+        self.target_frames = target_frames
+        self.detection_threshold = detection_threshold
+        self.consecutive_empty_frames = 0
+        self.max_empty_frames = max_empty_frames
+        self.language = language
+
+    def most_common(self):
+        """Return (class index, count) of the leading class, or (None, 0) if nothing was counted"""
+        if not self.counts.any():
+            return None, 0
+        index = int(self.counts.argmax())
+        return index, int(self.counts[index])
+
+    def to_bytes(self) -> bytes:
+        header = self.HEADER.pack(
+            self.frame_count, self.target_frames, self.detection_threshold,
+            self.consecutive_empty_frames, self.max_empty_frames, self.language.encode("ascii")
+        )
+        return header + self.counts.tobytes() + self.log_posterior.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        fields = cls.HEADER.unpack_from(data)
+        num_classes = (len(data) - cls.HEADER.size) // 12  # int32 count + float64 log posterior
+        counts = np.frombuffer(data, dtype=np.int32, count=num_classes, offset=cls.HEADER.size)
+        log_posterior = np.frombuffer(data, dtype=np.float64, offset=cls.HEADER.size + 4 * num_classes)
+        state = cls(num_classes, fields[5].decode("ascii"), fields[1], fields[2], fields[4])
+        state.counts = counts.copy()
+        state.log_posterior = log_posterior.copy()
+        state.frame_count = fields[0]
+        state.consecutive_empty_frames = fields[3]
+        return state
+
+
+class SessionStore:
+    """Interface for rotation session storage.
+
+    update() loads a session (creating it with factory() if missing), applies fn to it
+    and saves it back as one atomic step. fn returns None while the session should
+    live on; any other result is treated as a final verdict and the session is dropped.
+    """
+
+    async def create(self, session_id: str, state: RotationState):
+        raise NotImplementedError
+
+    async def update(self, session_id: str, fn, factory):
+        raise NotImplementedError
+
+    async def delete(self, session_id: str):
+        raise NotImplementedError
+
+    async def count(self) -> int:
+        raise NotImplementedError
+
+
+class InMemorySessionStore(SessionStore):
+    """Per-process store with TTL expiry, LRU eviction and a hard cap on live sessions"""
+
+    def __init__(self, ttl: float = 120, max_sessions: int = 1000):
+        self.ttl = ttl
+        self.max_sessions = max(1, int(max_sessions))
+        self._sessions = OrderedDict()  # session_id -> (state, expires_at), oldest first
+        self._lock = asyncio.Lock()
+        self.evicted = 0
+
+    def _sweep(self, now: float):
+        # Entries are kept in access order, so expired ones are always at the front
+        while self._sessions:
+            session_id, (_, expires_at) = next(iter(self._sessions.items()))
+            if expires_at > now:
+                break
+            del self._sessions[session_id]
+            self.evicted += 1
+
+    def _put(self, session_id: str, state: RotationState, now: float):
+        self._sessions[session_id] = (state, now + self.ttl)
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+
+    async def create(self, session_id: str, state: RotationState):
+        async with self._lock:
+            now = time.monotonic()
+            self._sweep(now)
+            self._put(session_id, state, now)
+
+    async def update(self, session_id: str, fn, factory):
+        async with self._lock:
+            now = time.monotonic()
+            self._sweep(now)
+            entry = self._sessions.get(session_id)
+            state = entry[0] if entry else factory()
+            result = fn(state)
+            if result is None:
+                self._put(session_id, state, now)
+            elif entry:
+                del self._sessions[session_id]
+            return state, result
+
+    async def delete(self, session_id: str):
+        async with self._lock:
+            self._sessions.pop(session_id, None)
+
+    async def count(self) -> int:
+        async with self._lock:
+            self._sweep(time.monotonic())
+            return len(self._sessions)
+
+
+class RedisSessionStore(SessionStore):
+    """Store shared by several uvicorn workers through any Redis-compatible server"""
+
+    INDEX_KEY = "rotation:index"
+
+    def __init__(self, url: str, ttl: float = 120, max_sessions: int = 1000):
+        import redis.asyncio as redis  # only needed when this backend is selected
+        self._watch_error = redis.WatchError
+        self.client = redis.from_url(url)
+        self.ttl = ttl
+        self.max_sessions = max(1, int(max_sessions))
+
+    def _key(self, session_id: str) -> str:
+        return f"rotation:{session_id}"
+
+    def _save(self, pipe, session_id: str, state: RotationState):
+        now = time.time()
+        pipe.set(self._key(session_id), state.to_bytes(), px=int(self.ttl * 1000))
+        pipe.zadd(self.INDEX_KEY, {session_id: now})
+
+    async def _enforce_cap(self):
+        # The index is scored by last access, so expired and least recently used ids sort first
+        await self.client.zremrangebyscore(self.INDEX_KEY, "-inf", time.time() - self.ttl)
+        overflow = await self.client.zcard(self.INDEX_KEY) - self.max_sessions
+        if overflow > 0:
+            for session_id, _ in await self.client.zpopmin(self.INDEX_KEY, overflow):
+                await self.client.delete(self._key(session_id.decode()))
+
+    async def create(self, session_id: str, state: RotationState):
+        async with self.client.pipeline(transaction=True) as pipe:
+            self._save(pipe, session_id, state)
+            await pipe.execute()
+        await self._enforce_cap()
+
+    async def update(self, session_id: str, fn, factory):
+        key = self._key(session_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    # Optimistic transaction: retry if another worker touched the session meanwhile
+                    await pipe.watch(key)
+                    data = await pipe.get(key)
+                    state = RotationState.from_bytes(data) if data else factory()
+                    result = fn(state)
+                    pipe.multi()
+                    if result is None:
+                        self._save(pipe, session_id, state)
+                    else:
+                        pipe.delete(key)
+                        pipe.zrem(self.INDEX_KEY, session_id)
+                    await pipe.execute()
+                    break
+                except self._watch_error:
+                    continue
+        if result is None and not data:
+            await self._enforce_cap()
+        return state, result
+
+    async def delete(self, session_id: str):
+        await self.client.delete(self._key(session_id))
+        await self.client.zrem(self.INDEX_KEY, session_id)
+
+    async def count(self) -> int:
+        await self.client.zremrangebyscore(self.INDEX_KEY, "-inf", time.time() - self.ttl)
+        return await self.client.zcard(self.INDEX_KEY)
+
+
+def create_session_store() -> SessionStore:
+    """Pick the session backend from SESSION_BACKEND (memory or redis)"""
+    ttl = float(os.getenv("SESSION_TTL_S", "120"))
+    max_sessions = int(os.getenv("SESSION_MAX", "1000"))
+    if os.getenv("SESSION_BACKEND", "memory") == "redis":
+        return RedisSessionStore(os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0"), ttl, max_sessions)
+    return InMemorySessionStore(ttl, max_sessions)
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionBusy, AdmissionController, FrameSuperseded
+
+
+async def hold(controller, client_id, release, log=None, shared=False):
+    """Take a slot, note the admission order, and keep the slot until release is set"""
+    try:
+        async with controller.slot(client_id, shared=shared):
+            if log is not None:
+                log.append(client_id)
+            await release.wait()
+        return "ok"
+    except (AdmissionBusy, FrameSuperseded) as e:
+        return type(e).__name__
+
+
+def test_newer_frame_supersedes_waiting_frame():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=4, per_client=1)
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(controller, "a", release))
+        await asyncio.sleep(0)
+        older = asyncio.create_task(hold(controller, "a", release))
+        await asyncio.sleep(0)
+        newer = asyncio.create_task(hold(controller, "a", release))
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(running, older, newer), controller
+
+    results, controller = asyncio.run(scenario())
+    assert results == ["ok", "FrameSuperseded", "ok"]
+    assert controller.rejected == {"busy": 0, "superseded": 1}
+    assert controller.in_flight == 0
+
+
+def test_waiting_frame_times_out_as_busy():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, wait_timeout=0.05)
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(controller, "a", release))
+        await asyncio.sleep(0)
+        waiting = await hold(controller, "b", release)
+        release.set()
+        return await running, waiting, controller
+
+    running, waiting, controller = asyncio.run(scenario())
+    assert (running, waiting) == ("ok", "AdmissionBusy")
+    assert controller.status()["waiting_clients"] == 0
+    assert controller.in_flight == 0
+
+
+def test_busy_when_too_many_clients_wait():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_waiting=1)
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(hold(controller, client_id, release)) for client_id in ("a", "b", "c")]
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(scenario()) == ["ok", "ok", "AdmissionBusy"]
+
+
+def test_free_slots_go_to_clients_in_arrival_order():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, per_client=1)
+        log, releases = [], {client_id: asyncio.Event() for client_id in "abc"}
+        first = asyncio.create_task(hold(controller, "a", releases["a"], log))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(hold(controller, "b", releases["b"], log))
+        await asyncio.sleep(0)
+        third = asyncio.create_task(hold(controller, "c", releases["c"], log))
+        await asyncio.sleep(0)
+        # A frame from the running client must queue behind the clients already waiting
+        again = asyncio.create_task(hold(controller, "a", releases["a"], log))
+        await asyncio.sleep(0)
+        for event in releases.values():
+            event.set()
+        await asyncio.gather(first, second, third, again)
+        return log
+
+    assert asyncio.run(scenario()) == ["a", "b", "c", "a"]
+
+
+@pytest.mark.parametrize("shared, expected", [(False, 1), (True, 3)])
+def test_address_keys_get_per_address_limit(shared, expected):
+    async def scenario():
+        controller = AdmissionController(max_in_flight=8, per_client=1, per_address=3)
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(hold(controller, "10.0.0.1", release, shared=shared)) for _ in range(3)]
+        await asyncio.sleep(0)
+        in_flight = controller.in_flight
+        release.set()
+        await asyncio.gather(*tasks)
+        return in_flight, controller
+
+    in_flight, controller = asyncio.run(scenario())
+    assert in_flight == expected
+    assert controller.in_flight == 0
+    assert not controller._shared
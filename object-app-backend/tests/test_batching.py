@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from batching import InferenceBatcher
+from execution import PoolBusyError
+
+
+class FakeModel:
+    """Echoes each image back as its result and records every predict call"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def predict(self, images, verbose=False, **predict_kwargs):
+        with self._lock:
+            self.calls.append((list(images), predict_kwargs))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return [(img, predict_kwargs) for img in images]
+
+
+def test_concurrent_frames_share_one_predict_per_argument_set():
+    model = FakeModel()
+
+    async def scenario():
+        batcher = InferenceBatcher(model, "object", max_batch_size=8, max_wait_ms=20)
+        batcher.start()
+        results = await asyncio.gather(
+            batcher.predict("a", conf=0.5),
+            batcher.predict("b", conf=0.5),
+            batcher.predict("c", conf=0.25),
+            batcher.predict("d", conf=0.5),
+        )
+        await batcher.stop()
+        return results
+
+    results = asyncio.run(scenario())
+    # Every frame gets its own result back, whichever call it ran in
+    assert results == [("a", {"conf": 0.5}), ("b", {"conf": 0.5}), ("c", {"conf": 0.25}), ("d", {"conf": 0.5})]
+    assert sorted(sorted(images) for images, _ in model.calls) == [["a", "b", "d"], ["c"]]
+
+
+def test_batches_never_exceed_max_batch_size():
+    model = FakeModel()
+
+    async def scenario():
+        batcher = InferenceBatcher(model, "object", max_batch_size=3, max_wait_ms=20)
+        await asyncio.gather(*[batcher.predict(i) for i in range(7)])
+        await batcher.stop()
+
+    asyncio.run(scenario())
+    assert max(len(images) for images, _ in model.calls) == 3
+    assert sorted(i for images, _ in model.calls for i in images) == list(range(7))
+
+
+def test_full_queue_rejects_frames():
+    async def scenario():
+        batcher = InferenceBatcher(FakeModel(delay=0.2), "object", max_batch_size=1, max_queue=1)
+        batcher.start()
+        first = asyncio.create_task(batcher.predict("a"))
+        await asyncio.sleep(0.05)  # "a" is running, the queue is empty again
+        second = asyncio.create_task(batcher.predict("b"))
+        await asyncio.sleep(0)
+        with pytest.raises(PoolBusyError):
+            await batcher.predict("c")
+        await asyncio.gather(first, second)
+        await batcher.stop()
+
+    asyncio.run(scenario())
+
+
+def test_stop_fails_running_and_queued_frames():
+    async def scenario():
+        batcher = InferenceBatcher(FakeModel(delay=0.3), "object", max_batch_size=1)
+        batcher.start()
+        running = asyncio.create_task(batcher.predict("a"))
+        await asyncio.sleep(0.05)
+        queued = asyncio.create_task(batcher.predict("b"))
+        await asyncio.sleep(0)
+        await batcher.stop()
+        return await asyncio.wait_for(asyncio.gather(running, queued, return_exceptions=True), 1)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) and "stopped" in str(r) for r in results)
@@ -0,0 +1,106 @@
+import io
+import zipfile
+
+import cv2
+import numpy as np
+import pytest
+
+from clips import auto_stride, fit_frame, image_frames, take, video_frames, zip_frames
+
+
+def encode_png(value: int, width: int = 64, height: int = 48) -> bytes:
+    ok, data = cv2.imencode(".png", np.full((height, width, 3), value, np.uint8))
+    assert ok
+    return data.tobytes()
+
+
+def make_zip(members: dict) -> io.BytesIO:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    buf.seek(0)
+    return buf
+
+
+@pytest.mark.parametrize("total, target, expected", [(100, 50, 2), (10, 50, 1), (149, 50, 2), (0, 50, 1), (-1, 50, 1)])
+def test_auto_stride(total, target, expected):
+    assert auto_stride(total, target) == expected
+
+
+def test_fit_frame_shrinks_only_large_frames():
+    img = np.zeros((480, 640, 3), np.uint8)
+    assert fit_frame(img, 800)[0] is img
+    small, scale = fit_frame(img, 320)
+    assert small.shape[:2] == (240, 320)
+    assert scale == (2.0, 2.0)
+
+
+def test_zip_frames_sample_images_in_name_order():
+    members = {f"clip/{i:02d}.png": encode_png(i * 10) for i in reversed(range(6))}
+    members["__MACOSX/clip/._00.png"] = b"resource fork"
+    members["clip/notes.txt"] = b"not an image"
+    stride, frames = zip_frames(make_zip(members), stride=2)
+    assert stride == 2
+    sampled = take(frames, 10)
+    assert [index for index, _, _ in sampled] == [0, 2, 4]
+    assert [int(img[0, 0, 0]) for _, img, _ in sampled] == [0, 20, 40]
+
+
+def test_zip_frames_auto_stride_counts_only_images():
+    members = {f"{i:03d}.jpg": encode_png(0) for i in range(20)}
+    stride, frames = zip_frames(make_zip(members), target_frames=5)
+    assert stride == 4
+    assert len(take(frames, 100)) == 5
+
+
+def test_zip_frames_reject_oversized_members_before_inflating():
+    members = {"a.png": encode_png(0), "b.png": encode_png(0, 512, 512) + bytes(1 << 16)}
+    _, frames = zip_frames(make_zip(members), stride=1, max_member_bytes=1 << 15)
+    assert len(take(frames, 1)) == 1
+    with pytest.raises(ValueError, match="b.png"):
+        take(frames, 1)
+
+
+def test_zip_frames_without_images():
+    with pytest.raises(ValueError):
+        zip_frames(make_zip({"readme.txt": b"hello"}))
+
+
+def test_image_frames_keep_upload_order():
+    files = [io.BytesIO(encode_png(value)) for value in (50, 10, 30, 20)]
+    files[0].read()  # a consumed stream is rewound before decoding
+    stride, frames = image_frames(files, stride=3)
+    assert stride == 3
+    assert [(index, int(img[0, 0, 0])) for index, img, _ in frames] == [(0, 50), (3, 20)]
+
+
+def test_take_reads_a_batch_at_a_time():
+    frames = iter(range(5))
+    assert take(frames, 2) == [0, 1]
+    assert take(frames, 2) == [2, 3]
+    assert take(frames, 2) == [4]
+    assert take(frames, 2) == []
+
+
+def test_video_frames(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+    if not writer.isOpened():
+        pytest.skip("no MJPG encoder in this OpenCV build")
+    for i in range(12):
+        writer.write(np.full((48, 64, 3), i * 20, np.uint8))
+    writer.release()
+
+    stride, frames = video_frames(path, target_frames=4, target_size=32)
+    assert stride == 3
+    sampled = list(frames)
+    assert [index for index, _, _ in sampled] == [0, 3, 6, 9]
+    assert all(img.shape[:2] == (24, 32) and scale == (2.0, 2.0) for _, img, scale in sampled)
+
+
+def test_video_frames_unreadable_file(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(b"not a video")
+    with pytest.raises(ValueError):
+        video_frames(str(path))
@@ -0,0 +1,70 @@
+import numpy as np
+
+from decision import SequentialDecision, class_confidences
+
+
+def confident_frame(num_classes, index, conf=0.9):
+    scores = np.zeros(num_classes)
+    scores[index] = conf
+    return scores
+
+
+def run(decision, frames):
+    """Feed frames one at a time, returning (frames seen, decision) at the first decision"""
+    log_posterior = np.zeros(len(frames[0]))
+    for count, scores in enumerate(frames, 1):
+        decision.update(log_posterior, scores)
+        decided = decision.decide(log_posterior, count)
+        if decided:
+            return count, decided
+    return len(frames), None
+
+
+def test_waits_for_min_frames_even_when_confident():
+    decision = SequentialDecision(confidence=0.99, min_frames=10)
+    count, decided = run(decision, [confident_frame(6, 2)] * 50)
+    assert count == 10
+    assert decided[0] == 2 and decided[1] >= 0.99
+
+
+def test_stops_early_on_consistent_frames():
+    decision = SequentialDecision(confidence=0.99, min_frames=1)
+    count, decided = run(decision, [confident_frame(6, 4)] * 50)
+    assert decided[0] == 4
+    assert count < 50
+
+
+def test_does_not_decide_on_alternating_classes():
+    decision = SequentialDecision(confidence=0.99, min_frames=1)
+    frames = [confident_frame(6, i % 2) for i in range(50)]
+    assert run(decision, frames)[1] is None
+
+
+def test_empty_frames_carry_no_evidence():
+    decision = SequentialDecision(confidence=0.99, min_frames=1)
+    assert run(decision, [np.zeros(6)] * 50)[1] is None
+
+
+def test_threshold_tracks_confidence_target():
+    frames = [confident_frame(6, 1, conf=0.6)] * 50
+    strict, _ = run(SequentialDecision(confidence=0.999, min_frames=1), frames)
+    loose, _ = run(SequentialDecision(confidence=0.9, min_frames=1), frames)
+    assert loose < strict
+
+
+class FakeBoxes:
+    def __init__(self, cls, conf):
+        self.cls, self.conf = np.array(cls), np.array(conf)
+
+    def __len__(self):
+        return len(self.cls)
+
+
+class FakeResults:
+    def __init__(self, cls, conf):
+        self.boxes = FakeBoxes(cls, conf)
+
+
+def test_class_confidences_keeps_best_box_per_class():
+    scores = class_confidences(FakeResults([1, 1, 3], [0.4, 0.8, 0.5]), 5)
+    assert scores.tolist() == [0, 0.8, 0, 0.5, 0]
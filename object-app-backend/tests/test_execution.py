@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from batching import InferenceBatcher
+from execution import BoundedPool, PoolBusyError
+
+
+def test_run_returns_result_and_frees_the_job():
+    async def scenario():
+        pool = BoundedPool("test", max_workers=1, max_pending=1, timeout=1)
+        result = await pool.run(lambda a, b=0: a + b, 2, b=3)
+        return result, pool.pending
+
+    assert asyncio.run(scenario()) == (5, 0)
+
+
+def test_timed_out_jobs_still_count_until_they_return():
+    release = threading.Event()
+
+    async def scenario():
+        pool = BoundedPool("test", max_workers=1, max_pending=2, timeout=0.05)
+        for _ in range(2):
+            with pytest.raises(asyncio.TimeoutError, match="test job did not finish within 0.05s"):
+                await pool.run(release.wait)
+        # Both callers gave up, but the jobs still hold the pool
+        assert pool.pending == 2
+        with pytest.raises(PoolBusyError):
+            pool.submit(release.wait)
+        release.set()
+        while pool.pending:
+            await asyncio.sleep(0.01)
+        return await pool.run(lambda: "free again")
+
+    assert asyncio.run(scenario()) == "free again"
+
+
+def test_timed_out_predict_keeps_the_batch_slot():
+    peak, active, lock = [0], [0], threading.Lock()
+
+    class SlowModel:
+        def predict(self, images, verbose=False, **predict_kwargs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.2)
+            with lock:
+                active[0] -= 1
+            return list(images)
+
+    async def scenario():
+        pool = BoundedPool("inference", max_workers=4, max_pending=16, timeout=0.05)
+        batcher = InferenceBatcher(SlowModel(), "object", pool=pool, max_wait_ms=1)
+        tasks = []
+        for i in range(3):
+            tasks.append(asyncio.create_task(batcher.predict(i)))
+            await asyncio.sleep(0.02)
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, asyncio.TimeoutError) for r in results)
+    # Threads were free, yet no second predict ever ran on the model alongside a timed out one
+    assert peak[0] == 1
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from gating import TouchGate, roi_window
+
+
+def frame(value: int = 0, size=(480, 640)):
+    img = np.full((*size, 3), value, np.uint8)
+    img[:, :size[1] // 2] = 255 - value  # some structure, so a brightness change moves the thumbnail
+    return img
+
+
+def moved(img, shift: int = 80):
+    return np.roll(img, shift, axis=1)
+
+
+HAND = (0, 0.9, (300, 200, 360, 260))
+
+
+def test_first_frame_runs_full():
+    gate = TouchGate()
+    source, value, _ = gate.plan("a", frame())
+    assert (source, value) == ("full", None)
+
+
+def test_unchanged_frame_reuses_last_detection():
+    gate = TouchGate()
+    img = frame()
+    _, _, signature = gate.plan("a", img)
+    gate.record("a", signature, HAND, "full")
+    source, value, _ = gate.plan("a", img.copy())
+    assert (source, value) == ("cache", HAND)
+
+
+def test_changed_frame_with_a_box_runs_on_a_crop_around_it():
+    gate = TouchGate()
+    img = frame()
+    _, _, signature = gate.plan("a", img)
+    gate.record("a", signature, HAND, "full")
+    source, window, _ = gate.plan("a", moved(img))
+    assert source == "roi"
+    left, top, right, bottom = window
+    assert left <= 300 and top <= 200 and right >= 360 and bottom >= 260
+    assert right - left == bottom - top
+
+
+def test_changed_frame_without_a_box_runs_full():
+    gate = TouchGate()
+    img = frame()
+    _, _, signature = gate.plan("a", img)
+    gate.record("a", signature, None, "full")
+    assert gate.plan("a", moved(img))[0] == "full"
+
+
+def test_full_pass_is_forced_every_full_every_frames():
+    gate = TouchGate(full_every=3)
+    img = frame()
+    _, _, signature = gate.plan("a", img)
+    gate.record("a", signature, HAND, "full")
+    sources = []
+    for _ in range(3):
+        source, _, signature = gate.plan("a", img)
+        gate.record("a", signature, HAND, source)
+        sources.append(source)
+    assert sources == ["cache", "cache", "full"]
+
+
+def test_clients_are_tracked_separately_and_capped():
+    gate = TouchGate(max_clients=2)
+    img = frame()
+    for client_id in ("a", "b"):
+        _, _, signature = gate.plan(client_id, img)
+        gate.record(client_id, signature, HAND, "full")
+    gate.plan("c", img)  # evicts "a", the least recently seen
+    assert gate.status()["clients"] == 2
+    assert gate.plan("b", img)[0] == "cache"
+    assert gate.plan("a", img)[0] == "full"
+
+
+def test_idle_clients_expire_after_ttl():
+    gate = TouchGate(ttl_s=0)
+    img = frame()
+    _, _, signature = gate.plan("a", img)
+    gate.record("a", signature, HAND, "full")
+    assert gate.plan("a", img)[0] == "full"
+
+
+@pytest.mark.parametrize("box, shape, expected", [
+    ((10, 10, 40, 40), (480, 640), (0, 0, 192, 192)),  # clamped to the top-left corner
+    ((600, 440, 630, 470), (480, 640), (448, 288, 640, 480)),  # clamped to the bottom-right corner
+    ((100, 100, 500, 450), (480, 640), None),  # no ROI size is large enough
+])
+def test_roi_window(box, shape, expected):
+    assert roi_window(box, shape) == expected
@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+import pytest
+
+from ingest import decode_frame, jpeg_size, letterbox, unletterbox
+
+
+def encode_jpeg(width, height):
+    ok, data = cv2.imencode(".jpg", np.zeros((height, width, 3), np.uint8))
+    assert ok
+    return data.tobytes()
+
+
+@pytest.mark.parametrize("width, height", [(640, 480), (1, 1), (4000, 3000), (333, 1777)])
+def test_jpeg_size_reads_sof(width, height):
+    assert jpeg_size(encode_jpeg(width, height)) == (width, height)
+
+
+def test_jpeg_size_skips_segments_before_sof():
+    data = encode_jpeg(320, 240)
+    # An APP1 segment whose payload looks like a SOF marker must be skipped by its length
+    app1 = b"\xff\xe1" + (2 + 9).to_bytes(2, "big") + b"\xff\xc0\x00\x11\x08\x00\x10\x00\x10"
+    assert jpeg_size(data[:2] + app1 + data[2:]) == (320, 240)
+
+
+@pytest.mark.parametrize("data", [b"", b"\x89PNG\r\n\x1a\n" + bytes(32), b"\xff\xd8", b"\xff\xd8\x00\x00" + bytes(16)])
+def test_jpeg_size_rejects_non_jpeg(data):
+    assert jpeg_size(data) is None
+
+
+def test_reduced_decode_reports_scale_back_to_frame():
+    img, scale = decode_frame(encode_jpeg(2560, 1920), 640)
+    assert img.shape[:2] == (480, 640)
+    assert scale == (4.0, 4.0)
+
+
+@pytest.mark.parametrize("shape", [(480, 640), (640, 480), (720, 1280), (500, 500)])
+def test_letterbox_pads_to_stride_and_unletterbox_inverts(shape):
+    img = np.zeros((*shape, 3), np.uint8)
+    boxed, ratio, (left, top) = letterbox(img, 640)
+    assert max(boxed.shape[:2]) == 640
+    assert boxed.shape[0] % 32 == 0 and boxed.shape[1] % 32 == 0
+
+    height, width = shape
+    box = (width * 0.1, height * 0.2, width * 0.7, height * 0.9)
+    mapped = tuple(v * ratio + pad for v, pad in zip(box, (left, top, left, top)))
+    assert np.allclose(unletterbox(mapped, ratio, (left, top), shape), box)
+
+
+def test_unletterbox_clips_to_image():
+    x1, y1, x2, y2 = unletterbox((-10, -10, 700, 700), 1.0, (0, 80), (480, 640))
+    assert (x1, y1, x2, y2) == (0.0, 0.0, 640, 480)
@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+import numpy as np
+
+from sessions import InMemorySessionStore, RotationState
+
+
+def test_state_round_trips_through_bytes():
+    state = RotationState(6, "si")
+    state.counts[2] = 7
+    state.log_posterior[1] = -1.5
+    state.frame_count = 9
+    state.consecutive_empty_frames = 3
+
+    restored = RotationState.from_bytes(state.to_bytes())
+    assert restored.counts.tolist() == state.counts.tolist()
+    assert np.allclose(restored.log_posterior, state.log_posterior)
+    assert (restored.frame_count, restored.language, restored.consecutive_empty_frames) == (9, "si", 3)
+
+
+def test_cap_evicts_least_recently_used():
+    async def scenario():
+        store = InMemorySessionStore(ttl=60, max_sessions=3)
+        for session_id in "abc":
+            await store.create(session_id, RotationState(4))
+        # Touching "a" makes "b" the least recently used one
+        await store.update("a", lambda state: None, lambda: RotationState(4))
+        await store.create("d", RotationState(4))
+        return store
+
+    store = asyncio.run(scenario())
+    assert list(store._sessions) == ["c", "a", "d"]
+    assert store.evicted == 1
+
+
+def test_sessions_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+
+    async def scenario():
+        store = InMemorySessionStore(ttl=10, max_sessions=10)
+        await store.create("a", RotationState(4))
+        now[0] += 5
+        await store.create("b", RotationState(4))
+        now[0] += 6  # "a" is 11s old, "b" 6s
+        return await store.count(), list(store._sessions)
+
+    assert asyncio.run(scenario()) == (1, ["b"])
+
+
+def test_update_creates_missing_session_and_drops_finished_one():
+    async def scenario():
+        store = InMemorySessionStore(ttl=60, max_sessions=10)
+
+        def count_frame(state):
+            state.frame_count += 1
+            return "done" if state.frame_count == 2 else None
+
+        first = await store.update("a", count_frame, lambda: RotationState(4))
+        second = await store.update("a", count_frame, lambda: RotationState(4))
+        return first, second, await store.count()
+
+    (state, result), (state_again, verdict), live = asyncio.run(scenario())
+    assert result is None
+    assert state_again is state and state.frame_count == 2 and verdict == "done"
+    assert live == 0
@@ -0,0 +1,38 @@
+import numpy as np
+
+from tta import augmented_views, weighted_vote
+from workers import RemoteResults
+
+
+def results(*boxes):
+    """Results with one (class id, confidence) pair per box"""
+    return RemoteResults(np.array([[0, 0, 1, 1, conf, cls] for cls, conf in boxes], np.float32).reshape(-1, 6), {}, {})
+
+
+NAMES = {0: "Cube", 1: "square pyramid", 2: "cylinder"}
+
+
+def test_vote_averages_each_class_best_box_over_all_views():
+    scores = weighted_vote([
+        results((0, 0.9), (0, 0.5), (1, 0.4)),
+        results((0, 0.7)),
+        results(),
+        results((1, 0.8)),
+    ], NAMES)
+    # Missing views count as zero, duplicate boxes in one view count once
+    assert scores == {"cube": 0.4, "square_pyramid": 0.3}
+    assert list(scores) == ["cube", "square_pyramid"]
+
+
+def test_vote_without_views_is_empty():
+    assert weighted_vote([], NAMES) == {}
+
+
+def test_views_keep_the_frame_type():
+    img = np.random.randint(0, 255, (120, 160, 3), np.uint8)
+    views = augmented_views(img)
+    assert len(views) == 5
+    assert views[0] is img
+    assert np.array_equal(views[1], img[:, ::-1])
+    assert views[2].shape == img.shape
+    assert all(view.dtype == np.uint8 and view.ndim == 3 for view in views)
@@ -0,0 +1,84 @@
+import os
+
+from tts import AudioCache, TTSBackend
+
+
+class CountingBackend(TTSBackend):
+    """Offline backend returning distinct fixed-size audio per text, counting syntheses"""
+
+    name = "counting"
+
+    def __init__(self, size: int = 100):
+        self.size = size
+        self.calls = 0
+
+    def synthesize(self, text: str, language: str) -> bytes:
+        self.calls += 1
+        return (f"{language}:{text}".encode() * self.size)[:self.size]
+
+
+def mp3_files(cache_dir):
+    return sorted(name for _, _, files in os.walk(cache_dir) for name in files if name.endswith(".mp3"))
+
+
+def test_memory_tier_is_lru():
+    backend = CountingBackend()
+    cache = AudioCache(backend, cache_dir=None, max_items=2)
+    cache.get("a", "en")
+    cache.get("b", "en")
+    cache.get("a", "en")  # "b" is now least recently used
+    cache.get("c", "en")
+    assert cache.lookup(cache.key("b", "en")) is None
+    assert cache.lookup(cache.key("a", "en")) is not None
+    assert backend.calls == 3
+
+
+def test_disk_tier_serves_after_memory_eviction(tmp_path):
+    backend = CountingBackend()
+    cache = AudioCache(backend, cache_dir=str(tmp_path), max_items=1)
+    first = cache.get("a", "en")
+    cache.get("b", "en")
+    assert cache.get("a", "en") == first
+    assert backend.calls == 2 and cache.disk_hits == 1
+
+
+def test_disk_tier_evicts_least_recently_used_over_cap(tmp_path):
+    cache = AudioCache(CountingBackend(size=100), cache_dir=str(tmp_path), max_items=1, max_disk_bytes=300)
+    for text in "abc":
+        cache.get(text, "en")
+    cache.lookup(cache.key("a", "en"))  # read back from disk, so "b" is least recently used
+    cache.get("d", "en")
+
+    assert cache.disk_bytes == 300 and cache.evictions == 1
+    assert mp3_files(tmp_path) == sorted(f"{cache.key(t, 'en')}.mp3" for t in "acd")
+
+
+def test_disk_cap_applies_to_files_from_earlier_runs(tmp_path):
+    AudioCache(CountingBackend(size=100), cache_dir=str(tmp_path), max_disk_bytes=0).prerender(
+        [(text, "en") for text in "abcde"]
+    )
+    cache = AudioCache(CountingBackend(size=100), cache_dir=str(tmp_path), max_disk_bytes=250)
+    assert cache.disk_bytes == 200
+    assert len(mp3_files(tmp_path)) == 2
+
+
+def test_registered_phrase_survives_restart_and_audio_eviction(tmp_path):
+    backend = CountingBackend(size=100)
+    cache = AudioCache(backend, cache_dir=str(tmp_path), max_items=1, max_disk_bytes=200)
+    key = cache.register("line one\nline two", "si")
+    for text in "abcd":
+        cache.get(text, "en")  # fills and overflows the byte cap with audio
+
+    # A fresh instance stands in for another worker process or a restart
+    other = AudioCache(backend, cache_dir=str(tmp_path), max_items=1, max_disk_bytes=200)
+    assert other.known(key)
+    assert other.phrase(key) == ("line one\nline two", "si")
+    assert not other.known("0" * 64)
+
+
+def test_phrase_files_are_capped_oldest_first(tmp_path):
+    cache = AudioCache(CountingBackend(), cache_dir=str(tmp_path), max_items=1, max_phrase_files=2)
+    keys = [cache.register(text, "en") for text in "abc"]
+
+    other = AudioCache(CountingBackend(), cache_dir=str(tmp_path))
+    assert [other.phrase(key) is not None for key in keys] == [False, True, True]
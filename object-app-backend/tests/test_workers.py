@@ -0,0 +1,61 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from execution import PoolBusyError
+from workers import InferenceWorkers, RemoteResults
+
+
+def ring(slots: int, timeout: float = 1.0) -> InferenceWorkers:
+    """Worker pool whose slot bookkeeping is usable without starting any process"""
+    workers = InferenceWorkers(1, slots=slots, timeout=timeout)
+    workers._free_slots = list(range(slots))
+    return workers
+
+
+def test_default_ring_holds_a_full_batch_of_both_models_per_worker():
+    assert InferenceWorkers(3).slot_count >= 2 * 3 * 8
+
+
+def test_batches_take_all_their_slots_at_once():
+    workers = ring(4)
+    first = workers._take_slots(3)
+    got = []
+    # A second 3-frame batch must not take the one free slot and then wait for more
+    waiter = threading.Thread(target=lambda: got.append(workers._take_slots(3)))
+    waiter.start()
+    time.sleep(0.05)
+    assert len(workers._free_slots) == 1 and not got
+    workers._return_slots(first)
+    waiter.join(1)
+    assert len(got[0]) == 3 and len(workers._free_slots) == 1
+
+
+def test_waiting_for_slots_times_out_as_busy():
+    workers = ring(2, timeout=0.05)
+    workers._take_slots(2)
+    with pytest.raises(PoolBusyError):
+        workers._take_slots(1)
+
+
+def test_batch_larger_than_ring_is_rejected():
+    with pytest.raises(ValueError):
+        ring(2)._take_slots(3)
+
+
+def test_oversized_frames_are_shrunk_to_fit_a_slot():
+    workers = InferenceWorkers(1, slot_bytes=100 * 100 * 3)
+    img, ratio = workers._fit(np.zeros((400, 200, 3), np.uint8))
+    assert img.nbytes <= workers.slot_bytes
+    assert ratio == pytest.approx(img.shape[0] / 400, rel=0.02)
+
+
+def test_remote_results_expose_box_columns():
+    data = np.array([[1, 2, 3, 4, 0.9, 5], [5, 6, 7, 8, 0.4, 1]], np.float32)
+    boxes = RemoteResults(data, {}, {}).boxes
+    assert len(boxes) == 2
+    assert boxes[0].xyxy.tolist() == [[1, 2, 3, 4]]
+    assert boxes.conf.tolist() == pytest.approx([0.9, 0.4])
+    assert boxes.cls.tolist() == [5, 1]
@@ -0,0 +1,48 @@
+import cv2
+
+
+def _pad(img, scale: float):
+    """Shrink the object inside a gray canvas of the original size (zoom out)"""
+    h, w = img.shape[:2]
+    small = cv2.resize(img, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+    top = (h - small.shape[0]) // 2
+    left = (w - small.shape[1]) // 2
+    return cv2.copyMakeBorder(
+        small, top, h - small.shape[0] - top, left, w - small.shape[1] - left,
+        cv2.BORDER_CONSTANT, value=(114, 114, 114)
+    )
+
+
+def _center_crop(img, scale: float):
+    """Keep the central part of the frame (zoom in)"""
+    h, w = img.shape[:2]
+    ch, cw = int(h * scale), int(w * scale)
+    top, left = (h - ch) // 2, (w - cw) // 2
+    return img[top:top + ch, left:left + cw]
+
+
+def augmented_views(img) -> list:
+    """Build the test-time augmentation views of one frame: identity, flips, zoom out and zoom in"""
+    crop = _center_crop(img, 0.85)
+    return [
+        img,
+        cv2.flip(img, 1),
+        _pad(img, 0.8),
+        crop,
+        cv2.flip(crop, 1),
+    ]
+
+
+def weighted_vote(results_list: list, names: dict) -> dict:
+    """Average each class's best box confidence over all views"""
+    scores = {}
+    for results in results_list:
+        best = {}
+        for cls_id, conf in zip(results.boxes.cls.tolist(), results.boxes.conf.tolist()):
+            label = names[int(cls_id)].strip().lower().replace(" ", "_")
+            best[label] = max(best.get(label, 0.0), float(conf))
+        for label, conf in best.items():
+            scores[label] = scores.get(label, 0.0) + conf
+
+    views = max(1, len(results_list))
+    return {label: round(score / views, 4) for label, score in sorted(scores.items(), key=lambda item: -item[1])}
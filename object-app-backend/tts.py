@@ -0,0 +1,307 @@
+import hashlib
+import importlib
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from gtts import gTTS
+
+
+class TTSBackend:
+    """Interface for anything that can turn text into MP3 bytes"""
+
+    name = "base"
+    voice = "default"
+
+    def synthesize(self, text: str, language: str) -> bytes:
+        raise NotImplementedError
+
+    def stream(self, text: str, language: str):
+        """Yield MP3 chunks as they are produced (backends that cannot stream yield everything at once)"""
+        yield self.synthesize(text, language)
+
+
+class GTTSBackend(TTSBackend):
+    """Google Translate TTS (needs network access)"""
+
+    name = "gtts"
+
+    def synthesize(self, text: str, language: str) -> bytes:
+        tts = gTTS(text=text, lang=language)
+        buf = BytesIO()
+        tts.write_to_fp(buf)
+        return buf.getvalue()
+
+    def stream(self, text: str, language: str):
+        # gTTS splits long text into several requests and yields each one's audio as it arrives
+        yield from gTTS(text=text, lang=language).stream()
+
+
+class StubTTSBackend(TTSBackend):
+    """Offline stand-in that returns a single silent MP3 frame for any text"""
+
+    name = "stub"
+    # MPEG-1 Layer III, 128 kbps, 44.1 kHz header followed by an empty 417 byte frame
+    SILENT_FRAME = b"\xff\xfb\x90\x64" + bytes(413)
+
+    def synthesize(self, text: str, language: str) -> bytes:
+        return self.SILENT_FRAME
+
+
+BACKENDS = {
+    "gtts": GTTSBackend,
+    "stub": StubTTSBackend,
+}
+
+
+def load_backend(spec: str) -> TTSBackend:
+    """Build a backend from a short name ("gtts", "stub") or a "module:ClassName" path"""
+    if spec in BACKENDS:
+        return BACKENDS[spec]()
+    if ":" in spec:
+        module_name, class_name = spec.split(":", 1)
+        return getattr(importlib.import_module(module_name), class_name)()
+    raise ValueError(f"Unknown TTS backend: {spec}")
+
+
+class AudioCache:
+    """Content-addressed MP3 cache with an in-memory LRU tier in front of an on-disk tier"""
+
+    def __init__(self, backend: TTSBackend, cache_dir: str = None, max_items: int = 256, max_disk_bytes: int = 256 << 20,
+                 max_phrase_files: int = 16384):
+        self.backend = backend
+        self.cache_dir = cache_dir
+        self.max_items = max(1, int(max_items))
+        self.max_disk_bytes = max(0, int(max_disk_bytes))
+        self.max_phrase_files = max(1, int(max_phrase_files))
+        self._memory = OrderedDict()
+        self._phrases = OrderedDict()  # key -> (text, language) for audio that can be rendered on request
+        self._disk = OrderedDict()  # path -> size of every MP3 in the disk tier, least recently used first
+        # Phrase files are tiny and capped by count on their own, oldest first, so filling
+        # the byte cap with audio never drops the phrase behind an id a client was just given
+        self._phrase_files = OrderedDict()
+        self.disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if cache_dir:
+            self._scan_disk()
+
+    def _scan_disk(self):
+        """Index what earlier runs left on disk, oldest first, so it counts towards the caps"""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith((".mp3", ".txt")):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(entries):
+            if path.endswith(".txt"):
+                self._phrase_files[path] = None
+            else:
+                self._disk[path] = size
+                self.disk_bytes += size
+        self._evict_disk()
+        self._evict_phrases()
+
+    def key(self, text: str, language: str) -> str:
+        raw = "\0".join((self.backend.name, self.backend.voice, language, text))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def register(self, text: str, language: str) -> str:
+        """Remember a phrase so it can be fetched later by its key, without synthesizing it yet.
+
+        The phrase is also written next to the disk tier, so any server process sharing
+        the cache directory can render it, including after a restart. That is blocking
+        file I/O, so call this off the event loop.
+        """
+        key = self.key(text, language)
+        with self._lock:
+            known = key in self._phrases
+            self._phrases[key] = (text, language)
+            self._phrases.move_to_end(key)
+            while len(self._phrases) > self.max_items * 4:
+                self._phrases.popitem(last=False)
+        if self.cache_dir and not known:
+            path = self._disk_path(key, ".txt")
+            if not os.path.exists(path):
+                self._write_file(path, f"{language}\n{text}".encode("utf-8"))
+                with self._lock:
+                    self._phrase_files[path] = None
+                self._evict_phrases()
+        return key
+
+    def phrase(self, key: str):
+        """Return the (text, language) registered under a key, or None"""
+        with self._lock:
+            phrase = self._phrases.get(key)
+        if phrase is None and self.cache_dir:
+            try:
+                with open(self._disk_path(key, ".txt"), "rb") as f:
+                    language, text = f.read().decode("utf-8").split("\n", 1)
+            except (OSError, ValueError):
+                return None
+            phrase = (text, language)
+        return phrase
+
+    def known(self, key: str) -> bool:
+        """Whether a key has cached audio or a registered phrase to render it from"""
+        with self._lock:
+            if key in self._memory or key in self._phrases:
+                return True
+        return bool(self.cache_dir) and (
+            os.path.exists(self._disk_path(key)) or os.path.exists(self._disk_path(key, ".txt"))
+        )
+
+    def _disk_path(self, key: str, suffix: str = ".mp3") -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}{suffix}")
+
+    def _write_file(self, path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so a concurrent reader never sees half a file
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _write(self, path: str, data: bytes):
+        self._write_file(path, data)
+        with self._lock:
+            self.disk_bytes += len(data) - self._disk.pop(path, 0)
+            self._disk[path] = len(data)
+        self._evict_disk()
+
+    def _evict_disk(self):
+        """Delete least recently used files until the disk tier fits in max_disk_bytes.
+
+        Every process sharing the directory keeps its own index, so the cap is per process
+        and files another process already removed are simply skipped.
+        """
+        while True:
+            with self._lock:
+                if not self.max_disk_bytes or self.disk_bytes <= self.max_disk_bytes or len(self._disk) <= 1:
+                    return
+                path, size = self._disk.popitem(last=False)
+                self.disk_bytes -= size
+                self.evictions += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _evict_phrases(self):
+        """Delete the oldest phrase files beyond max_phrase_files"""
+        while True:
+            with self._lock:
+                if len(self._phrase_files) <= self.max_phrase_files:
+                    return
+                path, _ = self._phrase_files.popitem(last=False)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _remember(self, key: str, audio: bytes):
+        with self._lock:
+            self._memory[key] = audio
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    def lookup(self, key: str):
+        """Return cached audio for a key from memory or disk, or None"""
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return audio
+
+        if self.cache_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, "rb") as f:
+                    audio = f.read()
+            except OSError:
+                return None
+            with self._lock:
+                if path in self._disk:
+                    self._disk.move_to_end(path)
+            self.disk_hits += 1
+            self._remember(key, audio)
+            return audio
+        return None
+
+    def get(self, text: str, language: str) -> bytes:
+        """Return MP3 bytes for text, synthesizing and storing them on a miss"""
+        key = self.key(text, language)
+        audio = self.lookup(key)
+        if audio is not None:
+            return audio
+
+        self.misses += 1
+        audio = self.backend.synthesize(text, language)
+        if not audio:
+            return audio
+
+        self._store(key, audio)
+        return audio
+
+    def stream(self, text: str, language: str):
+        """Yield MP3 chunks for text as the backend produces them, caching the whole clip at the end"""
+        key = self.key(text, language)
+        audio = self.lookup(key)
+        if audio is not None:
+            yield audio
+            return
+
+        self.misses += 1
+        chunks = []
+        for chunk in self.backend.stream(text, language):
+            chunks.append(chunk)
+            yield chunk
+        if chunks:
+            self._store(key, b"".join(chunks))
+
+    def _store(self, key: str, audio: bytes):
+        self._remember(key, audio)
+        if self.cache_dir:
+            self._write(self._disk_path(key), audio)
+
+    def prerender(self, phrases) -> int:
+        """Synthesize every (text, language) pair that is not cached yet, returning how many failed"""
+        failed = 0
+        for text, language in phrases:
+            try:
+                self.get(text, language)
+            except Exception as e:
+                failed += 1
+                print(f"Pre-render failed for [{language}] {text[:40]!r}: {e}")
+        return failed
+
+    def status(self) -> dict:
+        return {
+            "backend": self.backend.name,
+            "memory_items": len(self._memory),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "disk_bytes": self.disk_bytes,
+            "disk_evictions": self.evictions,
+        }
+
+
+audio_cache = AudioCache(
+    load_backend(os.getenv("TTS_BACKEND", "gtts")),
+    cache_dir=os.getenv("TTS_CACHE_DIR", "audio_cache") or None,
+    max_items=int(os.getenv("TTS_MEMORY_CACHE_SIZE", "256")),
+    max_disk_bytes=int(float(os.getenv("TTS_DISK_CACHE_MB", "256")) * (1 << 20)),
+    max_phrase_files=int(os.getenv("TTS_MAX_PHRASE_FILES", "16384")),
+)
@@ -0,0 +1,375 @@
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from batching import BATCH_MAX_SIZE
+from execution import PoolBusyError
+
+
+# Worker processes start from a fork server that has already imported these, so the
+# torch and ultralytics code pages are shared between workers instead of loaded N times
+PRELOAD_MODULES = ["torch", "ultralytics"]
+
+
+class RemoteBoxes:
+    """The slice of the ultralytics Boxes interface the endpoints use, over an (N, 6) array"""
+
+    def __init__(self, data: np.ndarray):
+        self.data = data  # x1, y1, x2, y2, confidence, class per row, most confident first
+
+    @property
+    def xyxy(self):
+        return self.data[:, :4]
+
+    @property
+    def conf(self):
+        return self.data[:, 4]
+
+    @property
+    def cls(self):
+        return self.data[:, 5]
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, index):
+        return RemoteBoxes(self.data[index:index + 1] if isinstance(index, int) else self.data[index])
+
+
+class RemoteResults:
+    """Detections for one frame as returned by a worker process"""
+
+    def __init__(self, data: np.ndarray, speed: dict, names: dict):
+        self.boxes = RemoteBoxes(data)
+        self.speed = speed
+        self.names = names
+
+
+class RemoteModel:
+    """Stands in for a YOLO model whose predict() runs in the worker processes"""
+
+    def __init__(self, workers: "InferenceWorkers", key: str, names: dict):
+        self.workers = workers
+        self.key = key
+        self.names = names
+
+    def predict(self, images: list, verbose: bool = False, **predict_kwargs) -> list:
+        return self.workers.predict(self.key, self.names, images, predict_kwargs)
+
+    def release(self):
+        """Free the worker copies once the registry has switched to another model"""
+        self.workers.unload(self.key)
+
+
+def _worker_main(index: int, tasks, results, shm_name: str, slot_bytes: int, threads: int, cpus):
+    """Inference worker: loads models on request and runs predicts on frames read from the ring"""
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+    import torch
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(1)
+
+    ring = shared_memory.SharedMemory(name=shm_name)
+    models = {}
+    while True:
+        message = tasks.get()
+        if message is None:
+            break
+        kind, job_id, key, *args = message
+        try:
+            if kind == "predict":
+                frames, predict_kwargs = args
+                # Views straight into the shared ring, nothing is copied on the way in
+                images = [np.ndarray(shape, np.uint8, ring.buf, slot * slot_bytes) for slot, shape in frames]
+                predicted = models[key].predict(images, verbose=False, **predict_kwargs)
+                reply = [(r.boxes.data.cpu().numpy(), r.speed) for r in predicted]
+                del images, predicted
+            elif kind == "load":
+                engine, warmup = args
+                model = engine.load()
+                if warmup:
+                    engine.warmup()
+                models[key] = model
+                reply = {
+                    "names": dict(model.names),
+                    "active_engine": engine.active_engine,
+                    "warmup_ms": engine.warmup_ms,
+                    "device": "cuda" if torch.cuda.is_available() else "cpu",
+                }
+            else:  # unload
+                models.pop(key, None)
+                reply = None
+            results.put((job_id, True, reply))
+        except Exception as e:
+            results.put((job_id, False, f"{type(e).__name__}: {e}"))
+    try:
+        ring.close()
+    except BufferError:
+        pass  # the predictor still references the last batch, the process is exiting anyway
+
+
+class InferenceWorkers:
+    """Pool of inference processes fed through a shared-memory ring of frame slots.
+
+    The front end copies each decoded frame into a free slot and sends the worker
+    only the slot number and shape. Detections come back as small (N, 6) arrays.
+    Every worker holds its own copy of each model and is sent batches by least
+    outstanding work, so throughput grows with the number of workers.
+    """
+
+    def __init__(self, size: int, threads: int = 1, slots: int = None, slot_bytes: int = 1280 * 1280 * 3,
+                 pin_cpus: bool = False, timeout: float = 30, load_timeout: float = 600):
+        self.size = max(1, int(size))
+        self.threads = max(1, int(threads))
+        # Each model can have one batch per worker in flight, so by default the ring holds
+        # full batches of both models on every worker at once
+        self.slot_count = max(1, int(slots or 2 * self.size * BATCH_MAX_SIZE))
+        self.slot_bytes = int(slot_bytes)
+        self.pin_cpus = pin_cpus
+        self.timeout = timeout
+        self.load_timeout = load_timeout  # loading may include an ONNX/OpenVINO export
+        self._ring = None
+        self._free_slots = []
+        self._slots_changed = threading.Condition()
+        self._processes = []
+        self._task_queues = []
+        self._outstanding = []
+        self._results = None
+        self._reader = None
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._job_ids = itertools.count()
+        self._model_ids = itertools.count()
+        self.device = None
+
+    def start(self):
+        """Create the ring and start the worker processes (blocks until they are spawned)"""
+        if self._processes:
+            return
+        try:
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(PRELOAD_MODULES)
+        except ValueError:
+            context = multiprocessing.get_context("spawn")
+
+        self._ring = shared_memory.SharedMemory(create=True, size=self.slot_count * self.slot_bytes)
+        self._free_slots = list(range(self.slot_count))
+        self._results = context.Queue()
+        cpu_count = os.cpu_count() or 1
+        for index in range(self.size):
+            cpus = None
+            if self.pin_cpus and hasattr(os, "sched_setaffinity"):
+                cpus = {(index * self.threads + i) % cpu_count for i in range(self.threads)}
+            tasks = context.Queue()
+            process = context.Process(
+                target=_worker_main,
+                args=(index, tasks, self._results, self._ring.name, self.slot_bytes, self.threads, cpus),
+                name=f"inference-worker-{index}",
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+            self._task_queues.append(tasks)
+            self._outstanding.append(0)
+        self._reader = threading.Thread(target=self._read_results, name="inference-results", daemon=True)
+        self._reader.start()
+
+    def _read_results(self):
+        last_check = time.monotonic()
+        while True:
+            try:
+                message = self._results.get(timeout=1)
+            except queue.Empty:
+                message = ()
+            if message is None:
+                return
+            if message:
+                job_id, ok, payload = message
+                with self._lock:
+                    entry = self._futures.pop(job_id, None)
+                    if entry is not None:
+                        self._outstanding[entry[1]] -= 1
+                if entry is not None:
+                    self._finish(entry, ok, payload)
+            if time.monotonic() - last_check >= 1:
+                last_check = time.monotonic()
+                self._reap_dead()
+
+    def _finish(self, entry: tuple, ok: bool, payload):
+        future, _, slots = entry
+        # Only now is the worker done reading these frames, even if the caller gave up long ago
+        self._return_slots(slots)
+        if ok:
+            future.set_result(payload)
+        else:
+            future.set_exception(RuntimeError(payload))
+
+    def _reap_dead(self):
+        """Fail the jobs of workers that exited, their frame slots can no longer be read"""
+        with self._lock:
+            dead = {i for i, process in enumerate(self._processes) if not process.is_alive()}
+            lost = [job_id for job_id, (_, worker, _) in self._futures.items() if worker in dead]
+            entries = [self._futures.pop(job_id) for job_id in lost]
+            for worker in dead:
+                self._outstanding[worker] = 0
+        for entry in entries:
+            self._finish(entry, False, f"inference worker {entry[1]} exited")
+
+    def _submit(self, worker: int, kind: str, key: str, *args, slots: tuple = ()) -> Future:
+        future = Future()
+        job_id = next(self._job_ids)
+        with self._lock:
+            self._futures[job_id] = (future, worker, slots)
+            self._outstanding[worker] += 1
+        try:
+            self._task_queues[worker].put((kind, job_id, key, *args))
+        except BaseException:
+            with self._lock:
+                self._futures.pop(job_id, None)
+                self._outstanding[worker] -= 1
+            raise
+        return future
+
+    def _alive(self) -> list:
+        alive = [i for i, process in enumerate(self._processes) if process.is_alive()]
+        if not alive:
+            raise RuntimeError("No inference worker is running")
+        return alive
+
+    def _least_busy(self) -> int:
+        with self._lock:
+            return min(self._alive(), key=lambda i: self._outstanding[i])
+
+    def _wait(self, future: Future, timeout: float, what: str):
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            raise TimeoutError(f"Inference worker did not finish {what} within {timeout}s") from None
+
+    def load(self, engine, warmup: bool = True) -> RemoteModel:
+        """Load a model into every worker, one worker first so an export only happens once"""
+        self.start()
+        key = f"{engine.name}#{next(self._model_ids)}"
+        first_worker, *other_workers = self._alive()
+        first = self._wait(self._submit(first_worker, "load", key, engine, warmup), self.load_timeout, f"loading {key}")
+        rest = [self._submit(worker, "load", key, engine, warmup) for worker in other_workers]
+        for future in rest:
+            self._wait(future, self.load_timeout, f"loading {key}")
+        engine.active_engine = first["active_engine"]
+        engine.warmup_ms = first["warmup_ms"]
+        self.device = first["device"]
+        return RemoteModel(self, key, first["names"])
+
+    def unload(self, key: str):
+        # Queued behind any batch still using the model, so those finish first
+        for worker in range(self.size):
+            self._submit(worker, "unload", key)
+
+    def _fit(self, img) -> tuple:
+        """Shrink a frame that does not fit in a slot, returning (image, scale back to the frame)"""
+        ratio = 1.0
+        if img.nbytes > self.slot_bytes:
+            # Boxes are scaled back up afterwards
+            ratio = (self.slot_bytes / img.nbytes) ** 0.5
+            img = cv2.resize(img, (int(img.shape[1] * ratio), int(img.shape[0] * ratio)), interpolation=cv2.INTER_AREA)
+        if img.ndim == 2:
+            img = img[:, :, None]
+        return img, ratio
+
+    def _take_slots(self, count: int) -> list:
+        """Take count ring slots in one step.
+
+        Taking a batch's slots one at a time would let two batches each hold part of
+        the ring and wait on each other until both time out.
+        """
+        if count > self.slot_count:
+            raise ValueError(f"A batch of {count} frames does not fit in the {self.slot_count}-slot inference ring")
+        with self._slots_changed:
+            if not self._slots_changed.wait_for(lambda: len(self._free_slots) >= count, timeout=self.timeout):
+                raise PoolBusyError(f"No {count} free frame slots in the inference ring")
+            taken = self._free_slots[-count:]
+            del self._free_slots[-count:]
+            return taken
+
+    def _return_slots(self, slots):
+        if slots:
+            with self._slots_changed:
+                self._free_slots.extend(slots)
+                self._slots_changed.notify_all()
+
+    def predict(self, key: str, names: dict, images: list, predict_kwargs: dict) -> list:
+        """Run one batch in the least busy worker (blocking, called from the inference thread pool).
+
+        Once submitted, the batch's ring slots belong to the job and are freed when the
+        worker replies or exits, never on a timeout here, since the worker may still be
+        reading them.
+        """
+        fitted = [self._fit(img) for img in images]
+        slots = tuple(self._take_slots(len(fitted)))
+        try:
+            frames = []
+            for slot, (img, _) in zip(slots, fitted):
+                view = np.ndarray(img.shape, np.uint8, self._ring.buf, slot * self.slot_bytes)
+                view[...] = img
+                frames.append((slot, img.shape))
+            future = self._submit(self._least_busy(), "predict", key, frames, predict_kwargs, slots=slots)
+        except BaseException:
+            self._return_slots(slots)
+            raise
+        replies = self._wait(future, self.timeout, "a batch")
+
+        results = []
+        for (data, speed), (_, ratio) in zip(replies, fitted):
+            if ratio != 1.0:
+                data[:, :4] /= ratio
+            results.append(RemoteResults(data, speed, names))
+        return results
+
+    def status(self) -> dict:
+        return {
+            "workers": self.size,
+            "alive": sum(process.is_alive() for process in self._processes),
+            "threads_per_worker": self.threads,
+            "outstanding": list(self._outstanding),
+            "free_slots": len(self._free_slots),
+            "slots": self.slot_count,
+        }
+
+    def shutdown(self):
+        for tasks in self._task_queues:
+            tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        if self._results is not None:
+            self._results.put(None)
+        if self._ring is not None:
+            self._ring.close()
+            self._ring.unlink()
+            self._ring = None
+        self._processes = []
+
+
+def create_workers():
+    """Inference worker pool from INFERENCE_WORKERS, or None to run the models in this process"""
+    size = int(os.getenv("INFERENCE_WORKERS", "0"))
+    if size <= 0:
+        return None
+    return InferenceWorkers(
+        size,
+        threads=int(os.getenv("WORKER_THREADS", "1")),
+        slots=int(os.getenv("WORKER_RING_SLOTS", "0")) or None,
+        slot_bytes=int(os.getenv("WORKER_SLOT_BYTES", str(1280 * 1280 * 3))),
+        pin_cpus=os.getenv("WORKER_PIN_CPUS", "0") == "1",
+        timeout=float(os.getenv("WORKER_TIMEOUT_S", "30")),
+        load_timeout=float(os.getenv("WORKER_LOAD_TIMEOUT_S", "600")),
+    )